@@ -0,0 +1,279 @@
+"""
+Benchmark com replay de vídeo/imagens pelo mesmo caminho detectar -> classificar -> anunciar
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detector import DetectorRoi, adicionar_argumentos
+from metricas import METRICAS
+
+EXTENSOES_IMAGEM = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Variantes = perfis em perfis/ (qualquer outro perfil pode ser passado pelo nome)
+VARIANTES = ("offline", "com_voz", "funcionando")
+
+
+class FalaNula:
+    """Substitui o worker de voz: apenas conta o que seria falado"""
+
+    tts_type = "nulo"
+    speaking = False
+
+    def __init__(self):
+        self.falas = []
+
+    def falar(self, texto, prioridade=None):
+        self.falas.append((time.perf_counter(), texto, prioridade))
+
+    def encerrar(self, timeout=None):
+        pass
+
+
+class FonteReplay:
+    """Frames de um arquivo de vídeo ou de um diretório de imagens"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        if os.path.isdir(caminho):
+            self.imagens = sorted(p for p in glob.glob(os.path.join(caminho, "*"))
+                                  if p.lower().endswith(EXTENSOES_IMAGEM))
+            self.cap = None
+            self.fps = 30.0
+        else:
+            self.imagens = None
+            self.cap = cv2.VideoCapture(caminho)
+            if not self.cap.isOpened():
+                raise IOError(f"Nao foi possivel abrir {caminho}")
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._indice = 0
+
+    def read(self):
+        if self.cap is not None:
+            return self.cap.read()
+        if self._indice >= len(self.imagens):
+            return False, None
+        frame = cv2.imread(self.imagens[self._indice])
+        self._indice += 1
+        return frame is not None, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+def memoria_pico_mb():
+    """Pico de memória residente do processo (MB) ou None se indisponível"""
+    try:
+        import resource
+
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KB, macOS em bytes
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def percentis(amostras):
+    """Resumo em milissegundos de uma lista de durações em segundos"""
+    if not amostras:
+        return None
+    ms = np.asarray(amostras) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "n": int(len(ms)),
+        "media": round(float(ms.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+def versao_git():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def criar_assistente(variante, backend, modelo, threads, imgsz=None, roi=None, processo=None,
+                     perigo=None):
+    from motor import Assistente
+
+    return Assistente(backend, modelo, threads, fala=FalaNula(), imgsz=imgsz, roi=roi,
+                      camera=False, perfil=variante, processo=processo, perigo=perigo)
+
+
+def executar(variante, caminho, backend=None, modelo=None, threads=None,
+             intervalo=1, max_frames=None, tempo_real=False, aquecimento=3,
+             imgsz=None, roi=None, processo=None, perigo=None):
+    """Reproduz a fonte pela variante e retorna o relatório de métricas"""
+    # Partida a frio: construção (carga do modelo e aquecimento) até o primeiro anúncio
+    t_partida = time.perf_counter()
+    assistente = criar_assistente(variante, backend, modelo, threads, imgsz, roi, processo, perigo)
+    pronto = time.perf_counter()
+    fonte = FonteReplay(caminho)
+
+    tempos = {"decodificacao": [], "perigo": [], "deteccao": [], "inferencia": [],
+              "pos_processamento": [], "anuncio": [], "desenho": [], "total": []}
+    perigo = assistente.perigo
+    frames = 0
+    deteccoes = 0
+
+    inicio = time.perf_counter()
+    try:
+        while max_frames is None or frames < max_frames:
+            t0 = time.perf_counter()
+            ret, frame = fonte.read()
+            t1 = time.perf_counter()
+            if not ret:
+                break
+
+            registrar = frames >= aquecimento
+            if registrar:
+                tempos["decodificacao"].append(t1 - t0)
+
+            # Caminho rápido em todo frame, no tempo do vídeo (TTC independe do replay)
+            if perigo is not None:
+                perigo.processar(frame, frames / fonte.fps)
+                if registrar:
+                    tempos["perigo"].append(time.perf_counter() - t1)
+                t1 = time.perf_counter()
+
+            if frames % intervalo == 0:
+                # Mesmo caminho do pipeline: profundidade, qualidade e métricas inclusas
+                lote = assistente.detect_objects(frame)
+                t2 = time.perf_counter()
+                assistente.announce(lote)
+                t3 = time.perf_counter()
+                assistente.render(frame, lote)
+                t4 = time.perf_counter()
+
+                deteccoes += len(lote)
+                if registrar:
+                    tempos["deteccao"].append(t2 - t1)
+                    # Etapas de detect_objects, pelos cronômetros que ela mesma registra
+                    tempos["inferencia"].append(METRICAS.ultimo("inferencia"))
+                    tempos["pos_processamento"].append(METRICAS.ultimo("pos_processamento"))
+                    tempos["anuncio"].append(t3 - t2)
+                    tempos["desenho"].append(t4 - t3)
+                    tempos["total"].append(t4 - t0)
+
+            frames += 1
+
+            # Mantém o ritmo original do vídeo (intervalos de anúncio realistas)
+            if tempo_real:
+                atraso = inicio + frames / fonte.fps - time.perf_counter()
+                if atraso > 0:
+                    time.sleep(atraso)
+    finally:
+        fonte.release()
+        assistente.detector.fechar()
+
+    duracao = time.perf_counter() - inicio
+    # Só os anúncios do replay, sem o aviso "Carregando"
+    falas = [f for f in assistente.fala.falas if f[0] >= pronto]
+    minutos_video = frames / fonte.fps / 60.0
+    latencia = {etapa: percentis(v) for etapa, v in tempos.items()}
+
+    return {
+        "variante": variante,
+        "backend": assistente.backend,
+        "modelo": modelo or assistente.perfil["detector"]["modelo"],
+        "imgsz": assistente.detector.imgsz,
+        "roi": isinstance(assistente.detector, DetectorRoi),
+        "processo": assistente.perfil["detector"]["processo"] if processo is None else processo,
+        "fonte": caminho,
+        "commit": versao_git(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "plataforma": platform.platform(),
+        "python": platform.python_version(),
+        "frames": frames,
+        "intervalo_deteccao": intervalo,
+        "tempo_real": tempo_real,
+        "fps": round(frames / duracao, 2) if duracao else None,
+        "deteccoes_por_frame": round(deteccoes / max(1, len(tempos["inferencia"])), 2),
+        "anuncios": len(falas),
+        "anuncios_por_minuto": round(len(falas) / (duracao / 60.0), 2) if duracao else None,
+        "anuncios_por_minuto_video": round(len(falas) / minutos_video, 2) if minutos_video else None,
+        "memoria_pico_mb": memoria_pico_mb(),
+        "partida_s": {
+            "inicializacao": round(pronto - t_partida, 3),
+            "primeiro_anuncio": round(falas[0][0] - t_partida, 3) if falas else None,
+        },
+        "latencia_ms": latencia,
+        # O caminho rápido tem SLO próprio: p99 por frame dentro do orçamento
+        "perigo": None if perigo is None else {
+            "alertas": perigo.alertas,
+            "slo_ms": perigo.slo * 1000,
+            "slo_ok": latencia["perigo"] is not None and latencia["perigo"]["p99"] <= perigo.slo * 1000,
+        },
+    }
+
+
+def imprimir(relatorio):
+    print(f"\n== {relatorio['variante']} ({relatorio['backend']}) ==")
+    print(f"Frames: {relatorio['frames']}  FPS: {relatorio['fps']}  "
+          f"Anuncios/min: {relatorio['anuncios_por_minuto']}  "
+          f"Memoria pico: {relatorio['memoria_pico_mb']} MB")
+    print(f"Partida: {relatorio['partida_s']['inicializacao']} s  "
+          f"Primeiro anuncio: {relatorio['partida_s']['primeiro_anuncio']} s")
+    for etapa, resumo in relatorio["latencia_ms"].items():
+        if resumo:
+            print(f"  {etapa:<18} p50 {resumo['p50']:8.2f} ms  p90 {resumo['p90']:8.2f} ms  "
+                  f"p99 {resumo['p99']:8.2f} ms")
+    perigo = relatorio["perigo"]
+    if perigo:
+        print(f"Alerta rapido: {perigo['alertas']} alerta(s), p99 "
+              f"{'dentro' if perigo['slo_ok'] else 'FORA'} do SLO de {perigo['slo_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do caminho de deteccao e anuncio")
+    parser.add_argument("fonte", help="arquivo de video ou diretorio de imagens")
+    parser.add_argument("--variante", default="offline",
+                        help=f"perfil ({', '.join(VARIANTES)} ou outro em perfis/) ou 'todas'")
+    parser.add_argument("--intervalo", type=int, default=1,
+                        help="detectar a cada N frames")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--tempo-real", action="store_true",
+                        help="reproduzir no FPS original do video")
+    parser.add_argument("--saida", default="benchmark.json",
+                        help="arquivo JSON com os resultados")
+    parser.add_argument("--sem-perigo", action="store_true",
+                        help="sem o alerta rapido de obstaculo em todo frame")
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    variantes = VARIANTES if args.variante == "todas" else [args.variante]
+    relatorios = []
+    for variante in variantes:
+        relatorio = executar(variante, args.fonte, args.backend, args.modelo, args.threads,
+                             intervalo=args.intervalo, max_frames=args.max_frames,
+                             tempo_real=args.tempo_real, imgsz=args.imgsz, roi=args.roi or None,
+                             processo=args.processo or None,
+                             perigo=False if args.sem_perigo else None)
+        imprimir(relatorio)
+        relatorios.append(relatorio)
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorios, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em {args.saida}")
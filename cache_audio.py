@@ -0,0 +1,243 @@
+"""
+Cache em disco do áudio das frases anunciadas e reprodução de baixa latência
+"""
+import hashlib
+import os
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+from metricas import METRICAS
+
+DIRETORIO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_voz")
+
+
+class Audio:
+    """PCM já decodificado, pronto para tocar"""
+
+    __slots__ = ('caminho', 'dados', 'canais', 'largura', 'taxa', 'duracao')
+
+    def __init__(self, caminho):
+        with wave.open(caminho, 'rb') as w:
+            self.canais = w.getnchannels()
+            self.largura = w.getsampwidth()
+            self.taxa = w.getframerate()
+            self.dados = w.readframes(w.getnframes())
+            self.duracao = w.getnframes() / float(self.taxa)
+        self.caminho = caminho
+
+
+class ReprodutorAudio:
+    """Toca WAV em memória (simpleaudio) ou do disco (winsound)"""
+
+    def __init__(self):
+        self.backend = None
+        try:
+            import simpleaudio
+            self._sa = simpleaudio
+            self.backend = "simpleaudio"
+            return
+        except ImportError:
+            pass
+        try:
+            import winsound
+            self._ws = winsound
+            self.backend = "winsound"
+        except ImportError:
+            pass
+
+    @property
+    def disponivel(self):
+        return self.backend is not None
+
+    def tocar(self, audio, interromper):
+        """Bloqueia até terminar ou até interromper() retornar True"""
+        if self.backend == "simpleaudio":
+            reproducao = self._sa.play_buffer(audio.dados, audio.canais,
+                                              audio.largura, audio.taxa)
+            while reproducao.is_playing():
+                if interromper():
+                    reproducao.stop()
+                    return
+                time.sleep(0.01)
+        else:
+            ws = self._ws
+            ws.PlaySound(audio.caminho, ws.SND_FILENAME | ws.SND_ASYNC | ws.SND_NODEFAULT)
+            fim = time.perf_counter() + audio.duracao
+            while time.perf_counter() < fim:
+                if interromper():
+                    ws.PlaySound(None, ws.SND_PURGE)
+                    return
+                time.sleep(0.01)
+
+
+class CacheAudio:
+    """Áudio sintetizado indexado por texto + configuração de voz
+
+    Frases do vocabulário fixo ficam sempre em disco, em `vocabulario/` (de
+    todos os perfis, idiomas e vozes já usados); textos livres entram em uma
+    LRU limitada a `max_livres` arquivos na raiz do diretório. As frases que ainda não estão em
+    disco ficam pendentes até o worker de voz ter tempo ocioso para sintetizá-las.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PADRAO, max_livres=200, max_memoria=128):
+        self.diretorio = diretorio
+        # Separado da LRU: trocar de perfil não apaga o vocabulário aquecido pelo outro
+        self.diretorio_vocabulario = os.path.join(diretorio, "vocabulario")
+        self.max_livres = max_livres
+        self.max_memoria = max_memoria
+        self.voz = ""
+        # Separador das partes de um resumo (TabelaFrases.separador)
+        self.separador = None
+
+        self._lock = threading.Lock()
+        self._vocabulario = set()
+        self._livres = OrderedDict()   # chave -> caminho, do menos para o mais recente
+        self._memoria = OrderedDict()  # chave -> Audio
+        self._pendentes = OrderedDict()  # texto -> None (ordem de chegada)
+
+        self.acertos = 0
+        self.faltas = 0
+
+        os.makedirs(self.diretorio_vocabulario, exist_ok=True)
+
+    def configurar_voz(self, voz):
+        """Define a configuração de voz que faz parte da chave (ex.: 'windows:1')"""
+        self.voz = voz
+
+        # Arquivos livres já existentes entram na LRU por data de uso
+        arquivos = [os.path.join(self.diretorio, n) for n in os.listdir(self.diretorio)
+                    if n.endswith(".wav") and ".tmp" not in n]
+        arquivos.sort(key=os.path.getmtime)
+        with self._lock:
+            for caminho in arquivos:
+                chave = os.path.basename(caminho)[:-4]
+                if chave not in self._vocabulario:
+                    self._livres[chave] = caminho
+
+    def chave(self, texto):
+        return hashlib.sha1(f"{self.voz}|{texto}".encode("utf-8")).hexdigest()
+
+    def caminho(self, texto):
+        chave = self.chave(texto)
+        vocabulario = os.path.join(self.diretorio_vocabulario, chave + ".wav")
+        if chave in self._vocabulario:
+            return vocabulario
+        livre = os.path.join(self.diretorio, chave + ".wav")
+        # Frase do vocabulário de outro perfil também serve como texto livre
+        return vocabulario if not os.path.exists(livre) and os.path.exists(vocabulario) else livre
+
+    def aquecer(self, textos, separador=None):
+        """Registra o vocabulário fixo e agenda a síntese do que falta
+
+        Com `separador`, textos que juntam partes do vocabulário tocam parte
+        por parte (`obter_partes`) em vez de virar um texto livre novo.
+        """
+        with self._lock:
+            if separador:
+                self.separador = separador
+            for texto in textos:
+                chave = self.chave(texto)
+                self._vocabulario.add(chave)
+                livre = self._livres.pop(chave, None)
+                caminho = self.caminho(texto)
+                if livre is not None and not os.path.exists(caminho):
+                    # Já sintetizado como texto livre: só muda de pasta
+                    try:
+                        os.replace(livre, caminho)
+                    except OSError:
+                        pass
+                if not os.path.exists(caminho):
+                    self._pendentes[texto] = None
+
+    def obter(self, texto):
+        """Audio do texto ou None (agendando a síntese para depois)"""
+        chave = self.chave(texto)
+        with self._lock:
+            audio = self._memoria.get(chave)
+            if audio is not None:
+                self._memoria.move_to_end(chave)
+                self._tocar_livre(chave)
+                self.acertos += 1
+                METRICAS.incrementar("cache_voz_acertos")
+                return audio
+
+        caminho = self.caminho(texto)
+        if not os.path.exists(caminho):
+            with self._lock:
+                self.faltas += 1
+                self._pendentes[texto] = None
+            METRICAS.incrementar("cache_voz_faltas")
+            return None
+
+        try:
+            audio = Audio(caminho)
+        except (wave.Error, EOFError, OSError):
+            os.remove(caminho)
+            return None
+
+        METRICAS.incrementar("cache_voz_acertos")
+        with self._lock:
+            self.acertos += 1
+            self._memoria[chave] = audio
+            while len(self._memoria) > self.max_memoria:
+                self._memoria.popitem(last=False)
+            self._tocar_livre(chave)
+        return audio
+
+    def obter_partes(self, texto):
+        """Audios das partes do vocabulário que formam `texto`, ou None
+
+        None se o texto não é uma junção de partes do vocabulário; senão uma
+        lista com None nas partes ainda não sintetizadas (já agendadas).
+        """
+        if not self.separador or self.separador not in texto:
+            return None
+        partes = texto.split(self.separador)
+        with self._lock:
+            if any(self.chave(parte) not in self._vocabulario for parte in partes):
+                return None
+        return [self.obter(parte) for parte in partes]
+
+    def _tocar_livre(self, chave):
+        if chave in self._livres:
+            self._livres.move_to_end(chave)
+            try:
+                os.utime(self._livres[chave])
+            except OSError:
+                pass
+
+    def tem_pendentes(self):
+        return bool(self._pendentes)
+
+    def proximo_pendente(self):
+        with self._lock:
+            if not self._pendentes:
+                return None
+            texto, _ = self._pendentes.popitem(last=False)
+            return texto
+
+    def adiar(self, texto):
+        """Devolve ao início dos pendentes uma frase cuja síntese foi interrompida"""
+        with self._lock:
+            self._pendentes[texto] = None
+            self._pendentes.move_to_end(texto, last=False)
+
+    def registrar(self, texto):
+        """Chamado após sintetizar `texto` em caminho(texto)"""
+        chave = self.chave(texto)
+        with self._lock:
+            if chave in self._vocabulario:
+                return
+            self._livres[chave] = self.caminho(texto)
+            self._livres.move_to_end(chave)
+
+            # LRU dos textos livres
+            while len(self._livres) > self.max_livres:
+                antiga, caminho = self._livres.popitem(last=False)
+                self._memoria.pop(antiga, None)
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
@@ -0,0 +1,252 @@
+"""
+Câmera resiliente: leitura em thread própria, vigia de travamento e reconexão automática
+"""
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+from metricas import METRICAS
+
+# Backends tentados em ordem; os que não existem na plataforma são pulados
+BACKENDS = (
+    ("DSHOW", cv2.CAP_DSHOW, "win32"),
+    ("V4L2", cv2.CAP_V4L2, "linux"),
+    ("padrao", cv2.CAP_ANY, None),
+)
+
+
+class GerenciadorCamera:
+    """Substitui o cv2.VideoCapture nos assistentes
+
+    Uma thread lê a câmera continuamente e guarda só o frame mais recente;
+    `read()` devolve o próximo frame novo. Falhas seguidas de leitura ou
+    nenhum frame por `timeout_travada` segundos derrubam a conexão, e a câmera
+    é reaberta com espera exponencial entre as tentativas (`backoff_inicial`
+    dobrando até `backoff_max`). `avisar(texto)` informa o usuário por voz.
+
+    Arquivos de vídeo não são reabertos: no fim do arquivo a câmera encerra.
+    """
+
+    def __init__(self, fonte=0, largura=640, altura=480, fps=30, mjpeg=True,
+                 timeout_travada=2.0, falhas_max=3, backoff_inicial=0.25, backoff_max=8.0,
+                 avisar=None, aviso_frame=None, nome=None):
+        self.fonte = fonte
+        self.nome = nome or str(fonte)
+        self.largura = largura
+        self.altura = altura
+        self.fps = fps
+        self.mjpeg = mjpeg
+
+        self.timeout_travada = timeout_travada
+        self.falhas_max = falhas_max
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.reconectar = not (isinstance(fonte, str) and os.path.isfile(fonte))
+
+        self._avisar = avisar
+        self._aviso_frame = aviso_frame
+
+        self._cond = threading.Condition()
+        self._cap = None
+        self._frame = None
+        self._seq = 0
+        self._lido = 0
+        self._geracao = 0
+        self._encerrada = threading.Event()
+
+        self.conectada = False
+        self.backend = None
+        self.ultimo_frame = 0.0
+        self.reconexoes = 0
+
+    @property
+    def encerrada(self):
+        return self._encerrada.is_set()
+
+    def isOpened(self):
+        return self.conectada
+
+    def _backends(self):
+        if not isinstance(self.fonte, int):
+            return [("padrao", cv2.CAP_ANY)]
+        return [(nome, api) for nome, api, plataforma in BACKENDS
+                if plataforma is None or sys.platform.startswith(plataforma)]
+
+    def _negociar(self, cap):
+        """Pede MJPEG, resolução e FPS; a câmera pode aceitar só parte"""
+        if self.mjpeg:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.largura)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.altura)
+        cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # Buffer mínimo: o frame entregue é o mais recente possível
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def _conectar(self):
+        """Tenta os backends em ordem; retorna o cap já lendo frames ou None"""
+        for nome, api in self._backends():
+            cap = cv2.VideoCapture(self.fonte, api)
+            if not cap.isOpened():
+                cap.release()
+                continue
+
+            if isinstance(self.fonte, int):
+                self._negociar(cap)
+            ret, frame = cap.read()
+            if not ret:
+                cap.release()
+                continue
+
+            self.backend = nome
+            h, w = frame.shape[:2]
+            print(f"Camera {self.nome}: {nome} {w}x{h} @ {cap.get(cv2.CAP_PROP_FPS):.0f} fps")
+            return cap
+        return None
+
+    def abrir(self):
+        """Conecta e inicia as threads de leitura e vigia
+
+        Mesmo sem câmera na primeira tentativa, as threads continuam tentando
+        reconectar; retorna se a conexão inicial deu certo.
+        """
+        cap = self._conectar()
+        if cap is None:
+            print(f"ERRO: Camera {self.nome} nao disponivel" +
+                  (", tentando reconectar" if self.reconectar else ""))
+            if not self.reconectar:
+                self._encerrada.set()
+                return False
+            self._aviso("Camera nao encontrada, tentando conectar")
+
+        self._iniciar_leitura(cap)
+        threading.Thread(target=self._vigiar, daemon=True).start()
+        return cap is not None
+
+    def _aviso(self, texto):
+        print(f"Camera {self.nome}: {texto}")
+        if self._avisar is not None:
+            self._avisar(texto)
+
+    def _iniciar_leitura(self, cap):
+        with self._cond:
+            self._geracao += 1
+            self._cap = cap
+            self.conectada = cap is not None
+            self.ultimo_frame = time.monotonic()
+            geracao = self._geracao
+        METRICAS.definir("camera_conectada", int(cap is not None))
+        threading.Thread(target=self._ler, args=(geracao,), daemon=True).start()
+
+    def _atual(self, geracao):
+        return geracao == self._geracao and not self._encerrada.is_set()
+
+    def _reabrir(self, geracao):
+        """Reconecta com backoff exponencial; None se encerrada ou substituída"""
+        inicio = time.monotonic()
+        espera = self.backoff_inicial
+        while self._atual(geracao):
+            cap = self._conectar()
+            if cap is not None:
+                with self._cond:
+                    if not self._atual(geracao):
+                        cap.release()
+                        return None
+                    self._cap = cap
+                    self.conectada = True
+                    self.ultimo_frame = time.monotonic()
+                self.reconexoes += 1
+                METRICAS.incrementar("reconexoes_camera")
+                METRICAS.definir("camera_conectada", 1)
+                METRICAS.observar("camera_indisponivel", time.monotonic() - inicio)
+                self._aviso("Camera reconectada")
+                return cap
+
+            self._encerrada.wait(espera)
+            espera = min(espera * 2, self.backoff_max)
+        return None
+
+    def _perder(self, geracao, motivo, aviso="Camera desconectada, reconectando"):
+        """Descarta a conexão atual; a thread de leitura reabre em seguida"""
+        with self._cond:
+            if not self._atual(geracao):
+                return
+            cap, self._cap = self._cap, None
+            self.conectada = False
+        METRICAS.definir("camera_conectada", 0)
+        print(f"Camera {self.nome}: {motivo}")
+        if cap is not None:
+            # release pode demorar com o dispositivo sumido: não segura quem chamou
+            threading.Thread(target=cap.release, daemon=True).start()
+
+        if not self.reconectar:
+            self._encerrada.set()
+            with self._cond:
+                self._cond.notify_all()
+            return
+        self._aviso(aviso)
+
+    def _ler(self, geracao):
+        cap = self._cap
+        falhas = 0
+        while self._atual(geracao):
+            if cap is None:
+                cap = self._reabrir(geracao)
+                if cap is None:
+                    break
+                falhas = 0
+
+            ret, frame = cap.read()
+            if not self._atual(geracao):
+                # O vigia já substituiu esta thread
+                break
+            if not ret:
+                falhas += 1
+                METRICAS.incrementar("falhas_captura")
+                if falhas >= self.falhas_max:
+                    self._perder(geracao, "falha na leitura")
+                    cap = None
+                continue
+
+            falhas = 0
+            with self._cond:
+                self._frame = frame
+                self._seq += 1
+                self.ultimo_frame = time.monotonic()
+                self._cond.notify_all()
+            if self._aviso_frame is not None:
+                self._aviso_frame.set()
+
+    def _vigiar(self):
+        """Leitura presa dentro do driver não volta sozinha: troca a thread"""
+        while not self._encerrada.wait(self.timeout_travada / 4):
+            with self._cond:
+                geracao = self._geracao
+                parada = self.conectada and time.monotonic() - self.ultimo_frame > self.timeout_travada
+            if parada:
+                METRICAS.incrementar("camera_travada")
+                self._perder(geracao, f"sem frames ha {self.timeout_travada:.1f} s")
+                if not self._encerrada.is_set():
+                    self._iniciar_leitura(None)
+
+    def read(self, timeout=0.5):
+        """(True, frame) com o próximo frame novo; (False, None) se não chegar a tempo"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != self._lido or self._encerrada.is_set(),
+                                timeout)
+            if self._seq == self._lido:
+                return False, None
+            self._lido = self._seq
+            return True, self._frame
+
+    def release(self):
+        self._encerrada.set()
+        with self._cond:
+            self._geracao += 1
+            cap, self._cap = self._cap, None
+            self.conectada = False
+            self._cond.notify_all()
+        if cap is not None:
+            cap.release()
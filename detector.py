@@ -0,0 +1,285 @@
+"""
+Detectores intercambiáveis: Ultralytics/PyTorch, ONNX Runtime e OpenVINO
+"""
+import ast
+import os
+
+import cv2
+import numpy as np
+
+BACKENDS = ("pytorch", "onnx", "onnx-int8", "openvino")
+
+
+class Detector:
+    """Interface comum: detectar(frames) -> lista de arrays (N, 6)
+
+    Cada linha do array é x1, y1, x2, y2, confiança, classe, em pixels do frame
+    original. `names` mapeia id da classe -> nome COCO. `imgsz` é o lado da
+    entrada da rede e `classes` restringe as classes avaliadas (None = todas).
+    """
+
+    names = {}
+    imgsz = 640
+    classes = None
+
+    def definir_classes(self, classes):
+        """Informa de antemão as únicas classes que interessam"""
+        self.classes = sorted(classes) if classes is not None else None
+
+    def definir_imgsz(self, imgsz):
+        """Troca o lado da entrada da rede em tempo de execução (modelos dinâmicos)"""
+        self.imgsz = imgsz
+
+    def detectar(self, frames):
+        raise NotImplementedError
+
+    def fechar(self):
+        """Libera recursos externos (processos, memória compartilhada)"""
+
+
+class DetectorUltralytics(Detector):
+    """Inferência do Ultralytics (PyTorch ou modelo exportado para OpenVINO)"""
+
+    def __init__(self, modelo='yolov8n.pt', imgsz=640):
+        from ultralytics import YOLO
+
+        self.model = YOLO(modelo)
+        self.names = self.model.names
+        self.imgsz = imgsz
+
+    def detectar(self, frames):
+        # classes= descarta as demais já no NMS do Ultralytics
+        results = self.model(frames, verbose=False, imgsz=self.imgsz, classes=self.classes)
+        return [r.boxes.data.cpu().numpy() for r in results]
+
+
+class DetectorOnnx(Detector):
+    """YOLOv8 exportado para ONNX rodando no onnxruntime (CPU)"""
+
+    def __init__(self, modelo, threads=None, imgsz=640, conf=0.25, iou=0.7, max_det=300):
+        import onnxruntime as ort
+
+        opcoes = ort.SessionOptions()
+        opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opcoes.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opcoes.intra_op_num_threads = threads or os.cpu_count() or 1
+        opcoes.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(modelo, opcoes, providers=['CPUExecutionProvider'])
+        self.entrada = self.session.get_inputs()[0].name
+
+        # O Ultralytics grava os nomes das classes nos metadados do ONNX
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta['names'])
+
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+        self._colunas = None
+
+    def definir_classes(self, classes):
+        super().definir_classes(classes)
+        self._colunas = np.asarray(self.classes) if classes is not None else None
+
+    def _letterbox(self, frame):
+        """Redimensiona mantendo proporção e completa com cinza até imgsz"""
+        h, w = frame.shape[:2]
+        escala = min(self.imgsz / h, self.imgsz / w)
+        nh, nw = round(h * escala), round(w * escala)
+        topo = (self.imgsz - nh) // 2
+        esquerda = (self.imgsz - nw) // 2
+
+        img = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        img = cv2.copyMakeBorder(img, topo, self.imgsz - nh - topo,
+                                 esquerda, self.imgsz - nw - esquerda,
+                                 cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        return img, escala, esquerda, topo
+
+    def _nms(self, saida, escala, esquerda, topo, shape):
+        """Saída (84, K) -> array (N, 6) em coordenadas do frame original"""
+        # Só as linhas de score das classes ativas entram no argmax
+        scores = saida[4:] if self._colunas is None else saida[4 + self._colunas]
+        melhor = scores.argmax(0)
+        conf = scores[melhor, np.arange(scores.shape[1])]
+
+        manter = conf > self.conf
+        if not manter.any():
+            return np.zeros((0, 6), np.float32)
+
+        caixas, conf, cls = saida[:4, manter].T, conf[manter], melhor[manter]
+        if self._colunas is not None:
+            cls = self._colunas[cls]
+
+        # cx, cy, w, h -> x, y, w, h no frame original
+        xywh = caixas.copy()
+        xywh[:, 0] = (caixas[:, 0] - caixas[:, 2] / 2 - esquerda) / escala
+        xywh[:, 1] = (caixas[:, 1] - caixas[:, 3] / 2 - topo) / escala
+        xywh[:, 2:] = caixas[:, 2:] / escala
+
+        indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), conf.tolist(), cls.tolist(),
+                                          self.conf, self.iou, top_k=self.max_det)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+
+        h, w = shape[:2]
+        xyxy = np.empty((len(indices), 4), np.float32)
+        xyxy[:, :2] = xywh[indices, :2]
+        xyxy[:, 2:] = xywh[indices, :2] + xywh[indices, 2:]
+        np.clip(xyxy[:, 0::2], 0, w, out=xyxy[:, 0::2])
+        np.clip(xyxy[:, 1::2], 0, h, out=xyxy[:, 1::2])
+
+        return np.column_stack([xyxy, conf[indices], cls[indices]]).astype(np.float32)
+
+    def detectar(self, frames):
+        preparados = [self._letterbox(f) for f in frames]
+
+        # BGR HWC uint8 -> RGB NCHW float32
+        lote = np.stack([p[0] for p in preparados])[..., ::-1].transpose(0, 3, 1, 2)
+        lote = np.ascontiguousarray(lote, dtype=np.float32) / 255.0
+
+        saidas = self.session.run(None, {self.entrada: lote})[0]
+        return [self._nms(s, e, l, t, f.shape)
+                for s, (_, e, l, t), f in zip(saidas, preparados, frames)]
+
+
+class DetectorRoi(Detector):
+    """Passe em baixa resolução no frame inteiro + recorte nítido da região de interesse
+
+    A ROI padrão é o terço central inferior, o caminho à frente do usuário
+    (posição "frente"). Frame e recorte vão no mesmo lote do detector base com
+    `imgsz` reduzido; como o recorte é menor, ele chega à rede quase na
+    resolução nativa. As caixas do recorte voltam às coordenadas do frame e um
+    NMS por classe junta os dois passes.
+    """
+
+    def __init__(self, base, roi=(1 / 3, 1 / 3, 2 / 3, 1.0), iou=0.5, margem=2):
+        self.base = base
+        self.names = base.names
+        self.imgsz = base.imgsz
+        self.roi = roi
+        self.iou = iou
+        self.margem = margem
+
+    def definir_classes(self, classes):
+        super().definir_classes(classes)
+        self.base.definir_classes(classes)
+
+    def definir_imgsz(self, imgsz):
+        super().definir_imgsz(imgsz)
+        self.base.definir_imgsz(imgsz)
+
+    def fechar(self):
+        self.base.fechar()
+
+    def _recorte(self, shape):
+        h, w = shape[:2]
+        x1, y1, x2, y2 = self.roi
+        return int(x1 * w), int(y1 * h), int(x2 * w), int(y2 * h)
+
+    def _combinar(self, inteiro, parcial, recorte, shape):
+        x1, y1, x2, y2 = recorte
+        h, w = shape[:2]
+
+        if len(parcial):
+            parcial = parcial.copy()
+            parcial[:, 0:4:2] += x1
+            parcial[:, 1:4:2] += y1
+
+            # Objeto cortado por uma borda interna do recorte fica com o passe inteiro
+            m = self.margem
+            cortada = (((x1 > 0) & (parcial[:, 0] <= x1 + m)) |
+                       ((y1 > 0) & (parcial[:, 1] <= y1 + m)) |
+                       ((x2 < w) & (parcial[:, 2] >= x2 - m)) |
+                       ((y2 < h) & (parcial[:, 3] >= y2 - m)))
+            parcial = parcial[~cortada]
+
+        if not len(parcial):
+            return inteiro
+        if not len(inteiro):
+            return parcial
+
+        todas = np.concatenate([parcial, inteiro])
+        xywh = todas[:, :4].copy()
+        xywh[:, 2:] -= xywh[:, :2]
+        indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), todas[:, 4].tolist(),
+                                          todas[:, 5].astype(np.int32).tolist(), 0.0, self.iou)
+        return todas[np.asarray(indices, dtype=np.int64).reshape(-1)]
+
+    def detectar(self, frames):
+        recortes = [self._recorte(f.shape) for f in frames]
+        partes = [f[y1:y2, x1:x2] for f, (x1, y1, x2, y2) in zip(frames, recortes)]
+
+        saidas = self.base.detectar(list(frames) + partes)
+        n = len(frames)
+        return [self._combinar(saidas[i], saidas[n + i], recortes[i], frames[i].shape)
+                for i in range(n)]
+
+
+def _exportar(modelo, formato, destino, **kwargs):
+    """Exporta o .pt uma única vez e reaproveita o arquivo nas próximas execuções"""
+    if not os.path.exists(destino):
+        from ultralytics import YOLO
+
+        print(f"Exportando {modelo} para {formato} (apenas na primeira execucao)...")
+        exportado = YOLO(modelo).export(format=formato, **kwargs)
+        if os.path.abspath(exportado) != os.path.abspath(destino):
+            os.replace(exportado, destino)
+    return destino
+
+
+def _quantizar_int8(origem, destino):
+    if not os.path.exists(destino):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print("Quantizando modelo ONNX para INT8...")
+        quantize_dynamic(origem, destino, weight_type=QuantType.QUInt8)
+    return destino
+
+
+def criar_detector(backend="pytorch", modelo="yolov8n.pt", threads=None, imgsz=None, roi=False,
+                   processo=False, avisar=None):
+    """Cria o detector do backend escolhido exportando o modelo se preciso
+
+    Sem `imgsz` explícito usa 640, ou 320 no modo ROI (o recorte compensa a
+    resolução menor no caminho à frente). Com `processo`, o modelo roda num
+    processo filho supervisionado (`avisar(texto)` informa reinícios).
+    """
+    base = os.path.splitext(modelo)[0]
+    imgsz = imgsz or (320 if roi else 640)
+
+    if processo:
+        from processo import DetectorProcesso
+
+        detector = DetectorProcesso(dict(backend=backend, modelo=modelo, threads=threads,
+                                         imgsz=imgsz), avisar=avisar)
+    elif backend == "pytorch":
+        detector = DetectorUltralytics(modelo, imgsz=imgsz)
+    elif backend in ("onnx", "onnx-int8"):
+        caminho = _exportar(modelo, "onnx", base + ".onnx", dynamic=True, simplify=True)
+        if backend == "onnx-int8":
+            caminho = _quantizar_int8(caminho, base + ".int8.onnx")
+        detector = DetectorOnnx(caminho, threads=threads, imgsz=imgsz)
+    elif backend == "openvino":
+        # Entrada dinâmica para aceitar outros valores de imgsz
+        caminho = _exportar(modelo, "openvino", base + "_openvino_model", dynamic=True)
+        detector = DetectorUltralytics(caminho, imgsz=imgsz)
+    else:
+        raise ValueError(f"Backend desconhecido: {backend}")
+
+    return DetectorRoi(detector) if roi else detector
+
+
+def adicionar_argumentos(parser):
+    """Opções de linha de comando comuns para escolher o detector"""
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="motor de inferencia do detector (padrao do perfil)")
+    parser.add_argument("--modelo", default=None,
+                        help="pesos YOLO de origem (padrao do perfil)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="threads intra-op do onnxruntime")
+    parser.add_argument("--imgsz", type=int, default=None,
+                        help="lado da entrada da rede (padrao 640, ou 320 com --roi)")
+    parser.add_argument("--roi", action="store_true",
+                        help="frame inteiro em baixa resolucao + recorte do caminho a frente")
+    parser.add_argument("--processo", action="store_true",
+                        help="inferencia num processo separado, reiniciado se cair ou travar")
@@ -0,0 +1,260 @@
+"""
+Distância métrica: altura conhecida por classe + distância focal, com profundidade monocular opcional
+"""
+import argparse
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from metricas import METRICAS
+from pipeline import FilaUltimo
+from pos_processamento import MUITO_PROXIMO, PROXIMO, DISTANTE
+
+# Altura física típica (m) por classe COCO
+ALTURAS = {
+    'person': 1.7,
+    'bicycle': 1.0,
+    'car': 1.5,
+    'motorcycle': 1.1,
+    'bus': 3.2,
+    'truck': 3.0,
+    'traffic light': 0.9,
+    'fire hydrant': 0.6,
+    'stop sign': 0.75,
+    'bench': 0.8,
+    'dog': 0.5,
+    'chair': 0.9,
+    'couch': 0.85,
+    'potted plant': 0.5,
+    'dining table': 0.75,
+    'tv': 0.5,
+    'bottle': 0.25,
+    'cup': 0.1,
+    'cell phone': 0.14,
+}
+
+# Pixels de folga para considerar que a caixa encosta na borda de cima ou de baixo
+MARGEM_CORTE = 2
+
+
+class ProfundidadeAssincrona:
+    """Modelo monocular de profundidade (ONNX) em baixa frequência numa thread própria
+
+    O laço de detecção só entrega frames (`enviar`, nunca bloqueia) e lê o
+    último mapa em cache (`mapa`), reaproveitado entre as atualizações. O mapa
+    é a disparidade relativa da saída do modelo (estilo MiDaS): maior = mais perto.
+    """
+
+    MEDIA = np.array([0.485, 0.456, 0.406], np.float32)
+    DESVIO = np.array([0.229, 0.224, 0.225], np.float32)
+
+    def __init__(self, modelo, intervalo=1.0, threads=1):
+        import onnxruntime as ort
+
+        opcoes = ort.SessionOptions()
+        opcoes.intra_op_num_threads = threads
+        opcoes.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(modelo, opcoes, providers=['CPUExecutionProvider'])
+
+        entrada = self.session.get_inputs()[0]
+        self.entrada = entrada.name
+        altura, largura = entrada.shape[2:4]
+        self.tamanho = (largura if isinstance(largura, int) else 256,
+                        altura if isinstance(altura, int) else 256)
+
+        self.intervalo = intervalo
+        self.fila = FilaUltimo()
+        self._mapa = None
+        self.atualizado = 0.0
+
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    def enviar(self, frame):
+        self.fila.colocar(frame)
+
+    def mapa(self):
+        return self._mapa
+
+    def _inferir(self, frame):
+        img = cv2.resize(frame, self.tamanho, interpolation=cv2.INTER_AREA)
+        img = (img[..., ::-1].astype(np.float32) / 255.0 - self.MEDIA) / self.DESVIO
+        lote = np.ascontiguousarray(img.transpose(2, 0, 1)[None])
+        saida = self.session.run(None, {self.entrada: lote})[0]
+        return np.squeeze(saida).astype(np.float32)
+
+    def _executar(self):
+        while True:
+            frame = self.fila.pegar()
+            if frame is None:
+                break
+            inicio = time.perf_counter()
+            try:
+                with METRICAS.cronometrar("profundidade"):
+                    self._mapa = self._inferir(frame)
+                self.atualizado = time.time()
+            except Exception as e:
+                print(f"Erro no modelo de profundidade: {e}")
+            # Frames que chegarem durante a pausa são substituídos pelo mais novo
+            time.sleep(max(0.0, self.intervalo - (time.perf_counter() - inicio)))
+
+    def fechar(self):
+        self.fila.fechar()
+
+
+class EstimadorDistancia:
+    """Distância em metros por d = focal * altura_real / altura_em_pixels
+
+    A distância focal vem de `focal_px` (calibrada) ou do campo de visão
+    horizontal. Com um modelo de profundidade, classes sem altura conhecida
+    usam a disparidade do mapa em cache, escalada pelas classes que têm altura.
+    """
+
+    def __init__(self, names, fov_horizontal=60.0, focal_px=None,
+                 limiar_muito_proximo=1.0, limiar_proximo=2.5, alturas=None, profundidade=None):
+        self.fov_horizontal = fov_horizontal
+        self.focal_px = focal_px
+        self.limiar_muito_proximo = limiar_muito_proximo
+        self.limiar_proximo = limiar_proximo
+        self.profundidade = profundidade
+
+        # Tabela id COCO -> altura (NaN se desconhecida)
+        tabela = {**ALTURAS, **(alturas or {})}
+        total = max(names) + 1
+        self.alturas = np.array([tabela.get(names.get(i), np.nan) for i in range(total)],
+                                np.float32)
+
+        # metros * disparidade, ajustado continuamente
+        self._escala = None
+
+    def focal(self, largura):
+        if self.focal_px:
+            return self.focal_px
+        return (largura / 2.0) / np.tan(np.radians(self.fov_horizontal) / 2.0)
+
+    def observar(self, frame):
+        """Entrega o frame ao modelo de profundidade (se houver), sem esperar"""
+        if self.profundidade is not None:
+            self.profundidade.enviar(frame)
+
+    def estimar(self, bbox, cls, shape):
+        """(N,) metros para as caixas de um frame; NaN onde não há estimativa
+
+        Caixas que encostam no topo ou na base do frame estão cortadas: a
+        altura visível é menor que a real e a conta daria só um limite
+        superior (objetos perto demais nunca sairiam "muito proximo"). Elas
+        ficam sem metros pela altura; a faixa vem da área ou da profundidade.
+        """
+        h, w = shape[:2]
+        altura_px = np.maximum(bbox[:, 3] - bbox[:, 1], 1).astype(np.float32)
+        metros = (self.focal(w) * self.alturas[cls] / altura_px).astype(np.float32)
+        cortada = (bbox[:, 1] <= MARGEM_CORTE) | (bbox[:, 3] >= h - MARGEM_CORTE)
+        metros[cortada] = np.nan
+
+        if self.profundidade is not None:
+            mapa = self.profundidade.mapa()
+            if mapa is not None:
+                self._completar(metros, bbox, shape, mapa)
+        return metros
+
+    def _completar(self, metros, bbox, shape, mapa):
+        h, w = shape[:2]
+        mh, mw = mapa.shape[:2]
+        disparidade = np.zeros(len(bbox), np.float32)
+        for i, (x1, y1, x2, y2) in enumerate(bbox.tolist()):
+            # Metade central da caixa, para não pegar o fundo
+            cx1, cx2 = (3 * x1 + x2) // 4, (x1 + 3 * x2) // 4
+            cy1, cy2 = (3 * y1 + y2) // 4, (y1 + 3 * y2) // 4
+            regiao = mapa[cy1 * mh // h:max(cy2 * mh // h, cy1 * mh // h + 1),
+                          cx1 * mw // w:max(cx2 * mw // w, cx1 * mw // w + 1)]
+            if regiao.size:
+                disparidade[i] = np.median(regiao)
+
+        validas = disparidade > 0
+        ancoras = validas & np.isfinite(metros)
+        if ancoras.any():
+            escala = float(np.median(metros[ancoras] * disparidade[ancoras]))
+            self._escala = escala if self._escala is None else 0.8 * self._escala + 0.2 * escala
+
+        sem_altura = validas & ~np.isfinite(metros)
+        if self._escala is not None and sem_altura.any():
+            metros[sem_altura] = self._escala / disparidade[sem_altura]
+
+    def classificar(self, metros):
+        """Metros -> MUITO_PROXIMO/PROXIMO/DISTANTE"""
+        distancia = np.full(len(metros), DISTANTE, dtype=np.int8)
+        distancia[metros < self.limiar_proximo] = PROXIMO
+        distancia[metros < self.limiar_muito_proximo] = MUITO_PROXIMO
+        return distancia
+
+    def fechar(self):
+        if self.profundidade is not None:
+            self.profundidade.fechar()
+
+
+def criar_estimador(config, names):
+    """EstimadorDistancia a partir da seção [distancia] do perfil; None = só área"""
+    if config.get("metodo", "altura") != "altura":
+        return None
+
+    profundidade = None
+    if config.get("profundidade_modelo"):
+        profundidade = ProfundidadeAssincrona(config["profundidade_modelo"],
+                                              intervalo=config.get("profundidade_intervalo", 1.0))
+
+    return EstimadorDistancia(names,
+                              fov_horizontal=config.get("fov_horizontal", 60.0),
+                              focal_px=config.get("focal_px") or None,
+                              limiar_muito_proximo=config.get("muito_proximo_m", 1.0),
+                              limiar_proximo=config.get("proximo_m", 2.5),
+                              alturas=config.get("alturas"),
+                              profundidade=profundidade)
+
+
+def focal_por_medida(altura_px, distancia_m, altura_m):
+    """Distância focal (px) de um objeto de altura conhecida a uma distância medida"""
+    return altura_px * distancia_m / altura_m
+
+
+if __name__ == "__main__":
+    # Calibração: uma pessoa (ou objeto da classe) parada a uma distância medida
+    from camera import GerenciadorCamera
+    from detector import criar_detector
+
+    parser = argparse.ArgumentParser(description="Calibra a distancia focal da camera")
+    parser.add_argument("--distancia", type=float, required=True,
+                        help="distancia real (m) entre a camera e o objeto")
+    parser.add_argument("--classe", default="person", help="classe COCO do objeto")
+    parser.add_argument("--altura", type=float, default=None,
+                        help="altura real (m); padrao da tabela ALTURAS")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--camera", type=int, default=0)
+    args = parser.parse_args()
+
+    altura_real = args.altura or ALTURAS[args.classe]
+    detector = criar_detector()
+    classe = next(i for i, nome in detector.names.items() if nome == args.classe)
+    detector.definir_classes([classe])
+
+    cap = GerenciadorCamera(args.camera)
+    cap.abrir()
+    alturas_px = []
+    try:
+        while len(alturas_px) < args.frames and not cap.encerrada:
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            dados = detector.detectar([frame])[0]
+            if len(dados):
+                maior = dados[np.argmax((dados[:, 3] - dados[:, 1]) * (dados[:, 2] - dados[:, 0]))]
+                alturas_px.append(maior[3] - maior[1])
+    finally:
+        cap.release()
+
+    if not alturas_px:
+        print(f"Nenhum(a) {args.classe} detectado(a)")
+    else:
+        focal = focal_por_medida(float(np.median(alturas_px)), args.distancia, altura_real)
+        print(f"focal_px = {focal:.1f}  (coloque na secao [distancia] do perfil)")
@@ -0,0 +1,280 @@
+"""
+Gravação de sessão: registros binários (NumPy estruturado) + keyframes JPEG, escritos em segundo plano
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from metricas import METRICAS
+
+DIRETORIO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessoes")
+
+# Um registro por frame inferido
+DTYPE_QUADRO = np.dtype([
+    ('quadro', '<u4'), ('t', '<f8'), ('n', '<u2'),
+    ('inferencia_ms', '<f4'), ('pos_ms', '<f4'),
+    ('keyframe', '<i4'),  # -1 quando o frame não foi salvo em JPEG
+])
+
+# Um registro por detecção
+DTYPE_DETECCAO = np.dtype([
+    ('quadro', '<u4'),
+    ('x1', '<i2'), ('y1', '<i2'), ('x2', '<i2'), ('y2', '<i2'),
+    ('confianca', '<f4'), ('classe', '<i2'), ('posicao', 'i1'), ('distancia', 'i1'),
+    ('metros', '<f4'), ('ttc', '<f4'),
+])
+
+# Um registro por fala enfileirada
+DTYPE_ANUNCIO = np.dtype([
+    ('t', '<f8'), ('quadro', '<u4'), ('prioridade', 'i1'), ('texto', 'S80'),
+])
+
+ARQUIVOS = {"quadros": DTYPE_QUADRO, "deteccoes": DTYPE_DETECCAO, "anuncios": DTYPE_ANUNCIO}
+
+
+def registros_deteccao(lote, quadro):
+    """LoteDeteccoes -> array DTYPE_DETECCAO (também usado no protocolo de rede)"""
+    deteccoes = np.zeros(len(lote), DTYPE_DETECCAO)
+    if len(lote):
+        deteccoes['quadro'] = quadro
+        for k, coluna in enumerate(('x1', 'y1', 'x2', 'y2')):
+            deteccoes[coluna] = lote.bbox[:, k]
+        deteccoes['confianca'] = lote.confianca
+        deteccoes['classe'] = lote.classe
+        deteccoes['posicao'] = lote.posicao
+        deteccoes['distancia'] = lote.distancia
+        deteccoes['metros'] = lote.metros
+        deteccoes['ttc'] = lote.ttc
+    return deteccoes
+
+
+class Gravador:
+    """Registra frames, detecções e anúncios sem custar taxa de quadros
+
+    Quem chama só monta os registros e os coloca numa fila limitada; uma
+    thread grava em arquivos só de acréscimo (`<nome>.bin`, registros crus,
+    abríveis com np.memmap) e codifica os keyframes JPEG. Com a fila cheia o
+    item é descartado e contado em `gravacao_descartes`.
+    """
+
+    def __init__(self, diretorio=None, perfil=None, keyframes_fps=1.0, max_fila=256,
+                 qualidade_jpeg=80):
+        self.diretorio = diretorio or os.path.join(DIRETORIO_PADRAO, time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(os.path.join(self.diretorio, "keyframes"), exist_ok=True)
+
+        self.keyframes_fps = keyframes_fps
+        self.qualidade_jpeg = qualidade_jpeg
+        self._arquivos = {nome: open(os.path.join(self.diretorio, nome + ".bin"), "ab")
+                          for nome in ARQUIVOS}
+
+        self._quadro = 0
+        self._keyframes = 0
+        self._ultimo_keyframe = -np.inf
+        self.descartes = 0
+
+        self._meta = {
+            "inicio": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "perfil": perfil,
+            "keyframes_fps": keyframes_fps,
+            "dtypes": {nome: dtype.descr for nome, dtype in ARQUIVOS.items()},
+        }
+        self._salvar_meta()
+
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._thread = threading.Thread(target=self._escrever, daemon=True)
+        self._thread.start()
+        print(f"Gravando sessao em {self.diretorio}")
+
+    def _salvar_meta(self):
+        with open(os.path.join(self.diretorio, "sessao.json"), "w", encoding="utf-8") as f:
+            json.dump(self._meta, f, indent=2, ensure_ascii=False)
+
+    def _enfileirar(self, item):
+        try:
+            self._fila.put_nowait(item)
+        except queue.Full:
+            self.descartes += 1
+            METRICAS.incrementar("gravacao_descartes")
+
+    def quadro(self, frame, t, lote, inferencia, pos):
+        """Registra um frame inferido (durações em segundos)"""
+        self._quadro += 1
+        indice = self._quadro
+
+        keyframe = -1
+        if self.keyframes_fps and t - self._ultimo_keyframe >= 1.0 / self.keyframes_fps:
+            self._ultimo_keyframe = t
+            keyframe = indice
+
+        registro = np.zeros(1, DTYPE_QUADRO)
+        registro[0] = (indice, t, len(lote), inferencia * 1000, pos * 1000, keyframe)
+
+        deteccoes = registros_deteccao(lote, indice)
+
+        # O frame não é alterado depois da inferência: basta a referência
+        self._enfileirar(("quadro", registro, deteccoes, frame if keyframe > 0 else None))
+
+    def anuncio(self, texto, prioridade):
+        registro = np.zeros(1, DTYPE_ANUNCIO)
+        registro[0] = (time.time(), self._quadro, prioridade,
+                       texto.encode("utf-8")[:DTYPE_ANUNCIO['texto'].itemsize])
+        self._enfileirar(("anuncio", registro))
+
+    def _escrever(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                break
+            try:
+                if item[0] == "quadro":
+                    _, registro, deteccoes, frame = item
+                    self._arquivos["quadros"].write(registro.tobytes())
+                    if len(deteccoes):
+                        self._arquivos["deteccoes"].write(deteccoes.tobytes())
+                    if frame is not None:
+                        caminho = os.path.join(self.diretorio, "keyframes",
+                                               f"{int(registro['quadro'][0]):07d}.jpg")
+                        cv2.imwrite(caminho, frame, [cv2.IMWRITE_JPEG_QUALITY, self.qualidade_jpeg])
+                        self._keyframes += 1
+                else:
+                    self._arquivos["anuncios"].write(item[1].tobytes())
+            except Exception as e:
+                print(f"Erro na gravacao: {e}")
+
+            # Sem fila pendente, empurra para o disco (sessão sobrevive a queda de energia)
+            if self._fila.empty():
+                for arquivo in self._arquivos.values():
+                    arquivo.flush()
+
+    def fechar(self, timeout=5):
+        try:
+            self._fila.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        for arquivo in self._arquivos.values():
+            arquivo.close()
+
+        self._meta.update(fim=time.strftime("%Y-%m-%dT%H:%M:%S"), quadros=self._quadro,
+                          keyframes=self._keyframes, descartes=self.descartes)
+        self._salvar_meta()
+        print(f"Sessao gravada: {self._quadro} quadros, {self._keyframes} keyframes, "
+              f"{self.descartes} descartes")
+
+
+def carregar_sessao(diretorio):
+    """Metadados e registros da sessão (np.memmap somente leitura)"""
+    with open(os.path.join(diretorio, "sessao.json"), encoding="utf-8") as f:
+        sessao = json.load(f)
+    for nome, dtype in ARQUIVOS.items():
+        caminho = os.path.join(diretorio, nome + ".bin")
+        tamanho = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        # Um registro cortado no fim (queda durante a escrita) é ignorado
+        n = tamanho // dtype.itemsize
+        sessao[nome] = (np.memmap(caminho, dtype=dtype, mode="r", shape=(n,))
+                        if n else np.zeros(0, dtype))
+    return sessao
+
+
+def adicionar_argumentos(parser):
+    parser.add_argument("--gravar", nargs="?", const="", default=None, metavar="DIRETORIO",
+                        help="grava a sessao (padrao: sessoes/<data-hora>)")
+    parser.add_argument("--keyframes-fps", type=float, default=1.0,
+                        help="frames por segundo salvos em JPEG na gravacao (0 desliga)")
+
+
+def criar_gravador(args, perfil=None):
+    if args.gravar is None:
+        return None
+    return Gravador(args.gravar or None, perfil=perfil, keyframes_fps=args.keyframes_fps)
+
+
+def _contagem(classes, distancias, names):
+    """{(classe, faixa): n} para comparar gravação e replay"""
+    from pos_processamento import DISTANCIAS
+
+    contagem = {}
+    for c, d in zip(classes.tolist(), distancias.tolist()):
+        chave = (names.get(c, str(c)), DISTANCIAS[d])
+        contagem[chave] = contagem.get(chave, 0) + 1
+    return contagem
+
+
+def replay(diretorio, perfil=None, backend=None, modelo=None, threads=None, imgsz=None, roi=None):
+    """Passa os keyframes gravados por detect_objects/announce com outro perfil
+
+    Sem `perfil`, usa o perfil salvo na sessão (confere reprodutibilidade).
+    """
+    import motor
+    from benchmark import FalaNula
+
+    sessao = carregar_sessao(diretorio)
+    quadros = sessao["quadros"]
+    gravadas = sessao["deteccoes"]
+    keyframes = quadros[quadros['keyframe'] >= 0]
+    if not len(keyframes):
+        print("Sessao sem keyframes: grave com --keyframes-fps > 0")
+        return None
+
+    fala = FalaNula()
+    assistente = motor.Assistente(backend, modelo, threads, fala=fala, imgsz=imgsz, roi=roi,
+                                  camera=False, perfil=perfil or sessao["perfil"])
+    names = assistente.detector.names
+    # Só os anúncios dos keyframes, sem o aviso "Carregando" da partida
+    fala.falas.clear()
+
+    antes = np.zeros(0, np.int64), np.zeros(0, np.int64)
+    depois = [], []
+    diferentes = 0
+    for registro in keyframes:
+        indice = int(registro['quadro'])
+        frame = cv2.imread(os.path.join(diretorio, "keyframes", f"{indice:07d}.jpg"))
+        if frame is None:
+            continue
+        lote = assistente.detect_objects(frame)
+        # Instante gravado: intervalo, crescimento e TTC com o dt real entre keyframes
+        assistente.anunciador.anunciar(lote, float(registro['t']))
+
+        originais = gravadas[gravadas['quadro'] == indice]
+        antes = (np.concatenate([antes[0], originais['classe']]),
+                 np.concatenate([antes[1], originais['distancia']]))
+        depois[0].extend(lote.classe.tolist())
+        depois[1].extend(lote.distancia.tolist())
+        diferentes += len(originais) != len(lote)
+
+    gravado = _contagem(*antes, names)
+    novo = _contagem(np.array(depois[0], np.int64), np.array(depois[1], np.int64), names)
+
+    print(f"\nReplay de {diretorio}: {len(keyframes)} keyframes, "
+          f"{diferentes} com numero de deteccoes diferente")
+    print(f"{'classe':<16}{'faixa':<14}{'gravado':>9}{'replay':>9}")
+    for classe, faixa in sorted(set(gravado) | set(novo)):
+        print(f"{classe:<16}{faixa:<14}{gravado.get((classe, faixa), 0):>9}"
+              f"{novo.get((classe, faixa), 0):>9}")
+    print(f"Anuncios: {len(sessao['anuncios'])} na sessao inteira, "
+          f"{len(fala.falas)} no replay dos keyframes")
+    for _, texto, _ in fala.falas:
+        print(f"  {texto}")
+
+    return {"keyframes": len(keyframes), "diferentes": diferentes,
+            "gravado": gravado, "replay": novo, "falas": [texto for _, texto, _ in fala.falas]}
+
+
+if __name__ == "__main__":
+    from detector import adicionar_argumentos as argumentos_detector
+
+    parser = argparse.ArgumentParser(description="Replay de uma sessao gravada")
+    parser.add_argument("sessao", help="diretorio da sessao (sessoes/<data-hora>)")
+    parser.add_argument("--perfil", default=None,
+                        help="perfil a comparar (padrao: o perfil gravado na sessao)")
+    argumentos_detector(parser)
+    args = parser.parse_args()
+
+    replay(args.sessao, args.perfil, args.backend, args.modelo, args.threads,
+           args.imgsz, args.roi or None)
@@ -0,0 +1,145 @@
+"""
+Frases dos anúncios por idioma: modelos compilados uma vez numa tabela (classe, distância, posição, quantidade)
+"""
+import os
+
+import numpy as np
+
+from pos_processamento import DISTANCIAS, POSICOES
+
+DIRETORIO_IDIOMAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "idiomas")
+
+# Chaves das seções [distancias] e [posicoes], na ordem dos códigos do lote
+CHAVES_DISTANCIA = tuple(d.replace(" ", "_") for d in DISTANCIAS)
+CHAVES_POSICAO = POSICOES
+GENEROS = ("m", "f")
+# Quantidades da tabela: 1, 2, 3, 4, 5 e 6 ou mais
+MAX_CONTAGEM = 6
+
+
+def caminho_idioma(idioma):
+    """Código curto ("pt") vira idiomas/pt.toml; caminhos ficam como estão"""
+    if os.path.exists(idioma):
+        return idioma
+    caminho = os.path.join(DIRETORIO_IDIOMAS, idioma + ".toml")
+    if os.path.exists(caminho):
+        return caminho
+    raise FileNotFoundError(f"Idioma nao encontrado: {idioma}")
+
+
+def carregar_idioma(idioma):
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+    with open(caminho_idioma(idioma), "rb") as f:
+        return tomllib.load(f)
+
+
+def _formas(valor):
+    """Texto único ou [m, f, m plural, f plural] -> as quatro formas"""
+    if isinstance(valor, str):
+        return (valor,) * 4
+    if len(valor) != 4:
+        raise ValueError(f"Esperadas 4 formas (m, f, m plural, f plural): {valor}")
+    return tuple(valor)
+
+
+def _classe(valor, padrao=None):
+    """[singular, plural, genero] (plural e gênero opcionais) -> tupla completa
+
+    Um texto solto igual ao singular de `padrao` (a tradução do idioma) herda
+    plural e gênero; outro nome qualquer fica invariável.
+    """
+    if isinstance(valor, str):
+        if padrao is not None and valor == padrao[0]:
+            return padrao
+        return valor, valor, padrao[2] if padrao is not None else "m"
+    singular, plural, genero = (list(valor) + [None, None])[:3]
+    genero = genero or "m"
+    if genero not in GENEROS:
+        raise ValueError(f"Genero invalido para {singular}: {genero}")
+    return singular, plural or singular, genero
+
+
+class TabelaFrases:
+    """Todas as partes de anúncio de um idioma, prontas para indexar
+
+    `frases[c, d, p, k]` é o texto de k+1 objetos da classe c (k = 5: seis ou
+    mais) na faixa de distância d e posição p, com gênero e número já
+    concordados. Os modelos do arquivo de idioma são formatados só aqui, na
+    partida; no laço um anúncio é um índice de array. `classes` (do perfil)
+    escolhe o que é anunciado: lista de nomes COCO, "todas", ou tabela de
+    nome COCO -> nome próprio (texto ou [singular, plural, genero]).
+
+    Os mesmos textos aquecem o cache de voz (`vocabulario`), então cada parte
+    já tem áudio pronto, falada sozinha ou em sequência num resumo.
+    """
+
+    def __init__(self, names, idioma="pt", classes="todas"):
+        dados = idioma if isinstance(idioma, dict) else carregar_idioma(idioma)
+        self.names = names
+        self.codigo = dados.get("codigo", "")
+        self.separador = dados.get("separador", ", ")
+        self.alerta_obstaculo = dados.get("alerta_obstaculo", "")
+
+        distancias = [_formas(dados["distancias"][c]) for c in CHAVES_DISTANCIA]
+        posicoes = [dados["posicoes"][c] for c in CHAVES_POSICAO]
+        numeros = dados.get("numeros", {})
+        masculino = numeros.get("masculino", [])
+        numeros = {"m": masculino, "f": numeros.get("feminino", masculino)}
+        for lista in numeros.values():
+            if len(lista) != MAX_CONTAGEM - 1:
+                raise ValueError(f"[numeros] precisa de {MAX_CONTAGEM - 1} valores "
+                                 "(2 a 5 e 'varios')")
+
+        traducoes = {nome: _classe(v) for nome, v in dados["classes"].items()}
+        if classes == "todas":
+            escolhidas = traducoes
+        elif isinstance(classes, dict):
+            escolhidas = {nome: _classe(v, traducoes.get(nome)) for nome, v in classes.items()}
+        else:
+            faltando = [nome for nome in classes if nome not in traducoes]
+            if faltando:
+                raise ValueError(f"Classes sem traducao em {self.codigo}: {', '.join(faltando)}")
+            escolhidas = {nome: traducoes[nome] for nome in classes}
+
+        # Nome COCO -> nome no idioma, só das classes anunciadas (para o pós-processamento)
+        self.classes = {nome: v[0] for nome, v in escolhidas.items()}
+
+        modelo = dados["modelo"]
+        total = max(names) + 1
+        self.frases = np.full((total, len(DISTANCIAS), len(POSICOES), MAX_CONTAGEM), None, object)
+        for c in range(total):
+            traducao = escolhidas.get(names.get(c))
+            if traducao is None:
+                continue
+            singular, plural, genero = traducao
+            g = GENEROS.index(genero)
+            for k in range(MAX_CONTAGEM):
+                sujeito = singular if k == 0 else f"{numeros[genero][k - 1]} {plural}"
+                forma = g if k == 0 else g + 2
+                for d, formas in enumerate(distancias):
+                    for p, posicao in enumerate(posicoes):
+                        self.frases[c, d, p, k] = modelo.format(
+                            sujeito=sujeito, distancia=formas[forma], posicao=posicao)
+
+    def frase(self, classe, distancia, posicao, n=1):
+        """Parte do anúncio para n objetos (um índice, sem formatação)"""
+        return self.frases[classe, distancia, posicao, min(n, MAX_CONTAGEM) - 1]
+
+    def juntar(self, partes):
+        return self.separador.join(partes)
+
+    def vocabulario(self):
+        """Partes de todas as quantidades, na ordem de aquecimento do cache de voz
+
+        Alertas mais urgentes primeiro e, em cada faixa, um objeto antes de
+        vários, para aquecerem antes. Um resumo é uma sequência dessas partes.
+        """
+        frases = self.frases
+        return [frases[c, d, p, k]
+                for d in range(frases.shape[1])
+                for k in range(frases.shape[3])
+                for c in range(frases.shape[0]) if frases[c, d, 0, k] is not None
+                for p in range(frases.shape[2])]
@@ -0,0 +1,165 @@
+"""
+Métricas do caminho crítico: histogramas móveis, contadores e endpoint Prometheus
+"""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+PREFIXO = "assistente"
+QUANTIS = (0.5, 0.9, 0.99)
+
+
+class HistogramaMovel:
+    """Últimas N durações para percentis, mais soma e contagem acumuladas"""
+
+    def __init__(self, janela=500):
+        self.amostras = deque(maxlen=janela)
+        self.soma = 0.0
+        self.contagem = 0
+
+    def observar(self, valor):
+        self.amostras.append(valor)
+        self.soma += valor
+        self.contagem += 1
+
+    def quantis(self):
+        if not self.amostras:
+            return {}
+        valores = np.percentile(np.fromiter(self.amostras, float), [q * 100 for q in QUANTIS])
+        return dict(zip(QUANTIS, valores.tolist()))
+
+
+class Metricas:
+    """Registro de métricas compartilhado pelos estágios do assistente"""
+
+    def __init__(self, janela=500):
+        self.janela = janela
+        self._lock = threading.Lock()
+        self._histogramas = {}
+        self._contadores = {}
+        self._medidores = {}
+        self.inicio = time.time()
+
+    def observar(self, nome, segundos):
+        with self._lock:
+            histograma = self._histogramas.get(nome)
+            if histograma is None:
+                histograma = self._histogramas[nome] = HistogramaMovel(self.janela)
+            histograma.observar(segundos)
+
+    def ultimo(self, nome):
+        """Última observação de `nome` (segundos), ou None"""
+        with self._lock:
+            histograma = self._histogramas.get(nome)
+            return histograma.amostras[-1] if histograma and histograma.amostras else None
+
+    @contextmanager
+    def cronometrar(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio)
+
+    def incrementar(self, nome, n=1):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + n
+
+    def definir(self, nome, valor):
+        with self._lock:
+            self._medidores[nome] = valor
+
+    def resumo(self):
+        """Snapshot em dicionário (milissegundos para os tempos)"""
+        with self._lock:
+            tempos = {}
+            for nome, h in self._histogramas.items():
+                quantis = h.quantis()
+                tempos[nome] = {f"p{int(q * 100)}": round(v * 1000, 2) for q, v in quantis.items()}
+                tempos[nome]["n"] = h.contagem
+            return {
+                "uptime_s": round(time.time() - self.inicio, 1),
+                "tempos_ms": tempos,
+                "contadores": dict(self._contadores),
+                "medidores": dict(self._medidores),
+            }
+
+    def texto_prometheus(self):
+        """Formato de exposição de texto do Prometheus"""
+        linhas = []
+        with self._lock:
+            for nome, h in sorted(self._histogramas.items()):
+                metrica = f"{PREFIXO}_{nome}_segundos"
+                linhas.append(f"# TYPE {metrica} summary")
+                for q, v in h.quantis().items():
+                    linhas.append(f'{metrica}{{quantile="{q}"}} {v:.6f}')
+                linhas.append(f"{metrica}_sum {h.soma:.6f}")
+                linhas.append(f"{metrica}_count {h.contagem}")
+            for nome, valor in sorted(self._contadores.items()):
+                metrica = f"{PREFIXO}_{nome}_total"
+                linhas.append(f"# TYPE {metrica} counter")
+                linhas.append(f"{metrica} {valor}")
+            for nome, valor in sorted(self._medidores.items()):
+                metrica = f"{PREFIXO}_{nome}"
+                linhas.append(f"# TYPE {metrica} gauge")
+                linhas.append(f"{metrica} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    def iniciar_servidor(self, porta, host="127.0.0.1"):
+        """Serve /metrics (Prometheus) e /json em uma thread própria"""
+        metricas = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/json"):
+                    corpo = json.dumps(metricas.resumo()).encode("utf-8")
+                    tipo = "application/json"
+                else:
+                    corpo = metricas.texto_prometheus().encode("utf-8")
+                    tipo = "text/plain; version=0.0.4"
+                self.send_response(200)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((host, porta), Handler)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        print(f"Metricas em http://{host}:{porta}/metrics")
+        return servidor
+
+    def iniciar_log(self, intervalo=30.0):
+        """Imprime uma linha JSON com o resumo a cada `intervalo` segundos"""
+        def registrar():
+            while True:
+                time.sleep(intervalo)
+                print("METRICAS " + json.dumps(self.resumo(), ensure_ascii=False))
+
+        threading.Thread(target=registrar, daemon=True).start()
+
+
+# Registro global usado por todos os módulos
+METRICAS = Metricas()
+
+
+def adicionar_argumentos(parser):
+    parser.add_argument("--metricas-porta", type=int, default=None,
+                        help="porta local do endpoint HTTP de metricas (Prometheus)")
+    parser.add_argument("--metricas-log", type=float, default=None,
+                        help="intervalo (s) da linha de log com as metricas")
+
+
+def configurar(args):
+    """Liga o endpoint e/ou o log periódico conforme a linha de comando"""
+    if args.metricas_porta:
+        METRICAS.iniciar_servidor(args.metricas_porta)
+    if args.metricas_log:
+        METRICAS.iniciar_log(args.metricas_log)
@@ -0,0 +1,497 @@
+"""
+Motor único do assistente, configurado por arquivo de perfil (TOML ou YAML)
+"""
+from partida import Partida, carregar_detector  # primeiro: marca o início da partida
+import argparse
+import copy
+import os
+import threading
+import time
+
+import cv2
+
+import gravacao
+import metricas
+import movimento
+import perigo
+import pipeline
+import qualidade
+from camera import GerenciadorCamera
+from cache_audio import CacheAudio
+from detector import adicionar_argumentos
+from distancia import criar_estimador
+from idioma import TabelaFrases
+from metricas import METRICAS
+from perigo import criar_detector as criar_perigo
+from pipeline import Pipeline
+from pos_processamento import PosProcessador, DISTANCIAS
+from qualidade import ControladorQualidade, ponto_inicial, PONTOS
+from rastreador import Rastreador, APROXIMANDO, prioridade_evento
+from resumo import ResumidorCena
+from tts import FalaWorker, NORMAL, URGENTE
+
+DIRETORIO_PERFIS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfis")
+
+# Cores por distância: muito proximo, proximo, distante
+CORES_DISTANCIA = ((0, 0, 255), (0, 165, 255), (0, 255, 0))
+# Só dois estados: alerta (muito próximo) ou normal
+CORES_ALERTA = ((0, 0, 255), (0, 255, 0), (0, 255, 0))
+
+# Valores usados quando o perfil não define a chave
+PERFIL_PADRAO = {
+    "nome": "Assistente de Acessibilidade",
+    "mensagens": {
+        "pronto": "Sistema pronto!",
+        "ativado": "Assistente de acessibilidade ativado",
+        "desativado": "",
+    },
+    "detector": {"backend": "pytorch", "modelo": "yolov8n.pt", "threads": 0,
+                 "imgsz": 0, "roi": False, "processo": False},
+    # conf_min: confiança para um objeto aparecer; conf_saida: abaixo dela ele some
+    "deteccao": {"conf_min": 0.5, "conf_saida": 0.35, "limiar_muito_proximo": 0.2,
+                 "limiar_proximo": 0.1, "ordenar": False},
+    # Filtro temporal por objeto: média móvel (alfa) e votos de `janela` frames para mudar de faixa
+    "filtro": {"alfa": 0.5, "janela": 5, "votos": 4},
+    "distancia": {"metodo": "altura", "fov_horizontal": 60.0, "focal_px": 0,
+                  "muito_proximo_m": 1.0, "proximo_m": 2.5,
+                  "profundidade_modelo": "", "profundidade_intervalo": 1.0},
+    # Frases em idiomas/<idioma>.toml; classes: nomes COCO anunciados, "todas" ou
+    # tabela nome COCO -> nome próprio
+    "idioma": "pt",
+    "classes": ["person"],
+    # modo "resumo": uma frase com os grupos mais perigosos; "evento": um objeto por vez
+    "anuncio": {"intervalo": 3.0, "distancia_max": "distante", "modo": "resumo"},
+    "resumo": {"max_grupos": 3, "memoria": 8.0, "risco": {}},
+    "ritmo": {"ocupacao_max": 0.5},
+    # Alerta rápido de obstáculo por fluxo óptico, em todo frame e fora do intervalo
+    "perigo": {"ativo": True, "ttc_alerta": 1.5, "confirmacoes": 2, "intervalo": 3.0,
+               "expansao_min": 0.005, "slo_ms": 20.0, "mensagem": ""},
+    # Ajuste automático de modelo/resolução/intervalo (pontos do mais caro ao mais barato)
+    "qualidade": {"ativo": False, "orcamento_ms": 200.0, "temp_max": 80.0, "carga_max": 0.9,
+                  "bateria_min": 20.0, "periodo": 2.0, "permanencia": 10.0,
+                  "pontos": [dict(p) for p in PONTOS]},
+    "voz": {"backends": ["windows", "pyttsx3"], "rate_windows": 1, "rate_pyttsx3": 150},
+    "tela": {"cores": "alerta", "rotulo": "{nome}", "textos": []},
+}
+
+
+def _ler_arquivo(caminho):
+    if caminho.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("Perfis YAML precisam do PyYAML: pip install pyyaml")
+        with open(caminho, encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+    with open(caminho, "rb") as f:
+        return tomllib.load(f)
+
+
+def caminho_perfil(perfil):
+    """Nome curto ("offline") vira perfis/offline.toml; caminhos ficam como estão"""
+    if os.path.exists(perfil):
+        return perfil
+    for extensao in (".toml", ".yaml", ".yml"):
+        caminho = os.path.join(DIRETORIO_PERFIS, perfil + extensao)
+        if os.path.exists(caminho):
+            return caminho
+    raise FileNotFoundError(f"Perfil nao encontrado: {perfil}")
+
+
+def carregar_perfil(perfil):
+    """Lê o perfil e completa com PERFIL_PADRAO (seções mescladas chave a chave)
+
+    Aceita também o dicionário de um perfil já carregado (ex.: o de uma sessão gravada).
+    """
+    dados = perfil if isinstance(perfil, dict) else _ler_arquivo(caminho_perfil(perfil))
+    resultado = copy.deepcopy(PERFIL_PADRAO)
+    for chave, valor in dados.items():
+        # A tabela de classes substitui a padrão por inteiro
+        if isinstance(valor, dict) and chave != "classes" and isinstance(resultado.get(chave), dict):
+            resultado[chave].update(valor)
+        else:
+            resultado[chave] = valor
+    return resultado
+
+
+class Anunciador:
+    """Decide o que falar a cada lote: rastreador, intervalo e resumo da cena
+
+    Um por fonte de vídeo; `frases` é a TabelaFrases (compartilhável entre
+    fontes), `speak(texto, prioridade)` entrega a fala e `anunciar` retorna
+    True quando algo foi falado. `reaproveitado` marca o lote reenviado pelo
+    pipeline em cena parada, que não conta como observação no rastreador.
+    """
+
+    def __init__(self, perfil, frases, speak):
+        anuncio = perfil["anuncio"]
+        self.speak = speak
+        self.frases = frases
+        self.intervalo = anuncio["intervalo"]
+        self.distancia_max = DISTANCIAS.index(anuncio["distancia_max"])
+        self.last_announcement = 0
+
+        deteccao, filtro = perfil["deteccao"], perfil["filtro"]
+        self.rastreador = Rastreador(conf_entrada=deteccao["conf_min"],
+                                     conf_saida=deteccao["conf_saida"], alfa=filtro["alfa"],
+                                     janela=filtro["janela"], votos=filtro["votos"])
+
+        self.resumidor = None
+        if anuncio["modo"] == "resumo":
+            resumo = perfil["resumo"]
+            self.resumidor = ResumidorCena(frases, max_grupos=resumo["max_grupos"],
+                                           memoria=resumo["memoria"], risco=resumo["risco"],
+                                           ttc_referencia=self.rastreador.ttc_alerta,
+                                           distancia_max=self.distancia_max)
+
+    def anunciar(self, detections, current_time, reaproveitado=False):
+        eventos = self.rastreador.atualizar(detections, current_time, reaproveitado)
+        # Faixa estável e área suavizada pelo filtro temporal
+        detections = self.rastreador.lote
+
+        if self.resumidor is not None:
+            return self._anunciar_resumo(detections, eventos, current_time)
+
+        # Eventos já vêm do mais importante (aproximação, novo, mudança de zona)
+        for evento in eventos:
+            i = evento.indice
+            if detections.distancia[i] > self.distancia_max:
+                continue
+
+            prioridade = prioridade_evento(evento, detections)
+            # Aproximação e alertas urgentes não esperam o intervalo
+            if (evento.tipo == APROXIMANDO or prioridade == URGENTE
+                    or current_time - self.last_announcement > self.intervalo):
+                message = self.frases.frase(detections.classe[i], detections.distancia[i],
+                                            detections.posicao[i])
+                self.speak(message, prioridade)
+                self.last_announcement = current_time
+                return True
+            METRICAS.incrementar("anuncios_suprimidos")
+            break
+        return False
+
+    def _anunciar_resumo(self, detections, eventos, current_time):
+        """Resume a cena a cada intervalo, ou já, se algo se aproxima"""
+        aproximando = [e.indice for e in eventos if e.tipo == APROXIMANDO
+                       and detections.distancia[e.indice] <= self.distancia_max]
+        if not aproximando and current_time - self.last_announcement <= self.intervalo:
+            if eventos:
+                METRICAS.incrementar("anuncios_suprimidos")
+            return False
+
+        resumo = self.resumidor.resumir(detections, current_time, forcar=aproximando,
+                                        mascara=self.rastreador.visiveis)
+        if resumo is None:
+            return False
+        message, prioridade = resumo
+        self.speak(message, prioridade)
+        self.last_announcement = current_time
+        return True
+
+
+class Assistente:
+    """Detecção, rastreamento, voz e exibição comuns a todas as variantes
+
+    Subclasses apenas escolhem o perfil em PERFIL; os argumentos do construtor
+    diferentes de None têm precedência sobre o perfil.
+    """
+
+    PERFIL = "offline"
+
+    def __init__(self, backend=None, modelo=None, threads=None, fala=None,
+                 imgsz=None, roi=None, camera=True, perfil=None, processo=None, qualidade=None,
+                 perigo=None):
+        self.perfil = carregar_perfil(perfil or self.PERFIL)
+        self.nome = self.perfil["nome"]
+        self.mensagens = self.perfil["mensagens"]
+        print(f"Inicializando {self.nome}...")
+        self.partida = Partida()
+
+        config = self.perfil["detector"]
+        backend = backend or config["backend"]
+        modelo = modelo or config["modelo"]
+        threads = threads or config["threads"] or None
+        imgsz = imgsz or config["imgsz"] or None
+        roi = config["roi"] if roi is None else roi
+        processo = config["processo"] if processo is None else processo
+        self.backend = backend
+        self.modelo = modelo
+        # Para recarregar o detector quando o controle de qualidade troca de modelo
+        self._carga = dict(threads=threads, roi=roi, processo=processo)
+
+        # Modelo (import do torch, pesos e aquecimento) e câmera carregam em paralelo
+        self.partida.iniciar(
+            modelo=lambda: carregar_detector(backend, modelo, threads, imgsz, roi,
+                                             processo=processo, avisar=self._avisar_urgente),
+            camera=self._abrir_camera if camera else None)
+
+        # Thread de voz persistente; avisa que está carregando
+        voz = self.perfil["voz"]
+        self.cache_voz = CacheAudio()
+        self.fala = fala or FalaWorker(backends=tuple(voz["backends"]),
+                                       rate_windows=voz["rate_windows"],
+                                       rate_pyttsx3=voz["rate_pyttsx3"], cache=self.cache_voz)
+        self.tts_type = self.fala.tts_type
+        # Direto no worker: o aviso de partida não entra no intervalo dos anúncios
+        self.fala.falar("Carregando")
+        self.partida.marcar("voz")
+
+        etapas = self.partida.aguardar()
+        self.detector, self.cap = etapas["modelo"], etapas["camera"]
+
+        # Gravação de sessão, ligada em run()
+        self.gravador = None
+        self.pipeline = None
+
+        # Frases do idioma compiladas uma vez; define também as classes anunciadas
+        self.frases = TabelaFrases(self.detector.names, self.perfil["idioma"],
+                                   self.perfil["classes"])
+
+        # Distância em metros (altura conhecida + focal, profundidade opcional)
+        self.estimador = criar_estimador(self.perfil["distancia"], self.detector.names)
+
+        # Pós-processamento vetorizado; sem estimativa métrica a faixa vem da área.
+        # Passa tudo acima do limiar de saída: a histerese fica com o rastreador
+        deteccao = self.perfil["deteccao"]
+        self.pos = PosProcessador(self.detector.names, self.frases.classes,
+                                  conf_min=min(deteccao["conf_min"], deteccao["conf_saida"]),
+                                  limiar_muito_proximo=deteccao["limiar_muito_proximo"],
+                                  limiar_proximo=deteccao["limiar_proximo"],
+                                  estimador=self.estimador)
+        self.ordenar = deteccao["ordenar"]
+        # O detector já descarta as classes fora da lista
+        self.detector.definir_classes(self.pos.ids_permitidos())
+
+        self.anunciador = Anunciador(self.perfil, self.frases, self.speak)
+        self.rastreador = self.anunciador.rastreador
+
+        # Controle adaptativo de qualidade (inicia com o pipeline)
+        config = self.perfil["qualidade"]
+        self.qualidade = None
+        self._troca = threading.Lock()
+        if config["ativo"] if qualidade is None else qualidade:
+            pontos = config["pontos"]
+            self.qualidade = ControladorQualidade(
+                pontos, inicial=ponto_inicial(pontos, modelo, self.detector.imgsz),
+                orcamento_ms=config["orcamento_ms"], temp_max=config["temp_max"],
+                carga_max=config["carga_max"], bateria_min=config["bateria_min"],
+                periodo=config["periodo"], permanencia=config["permanencia"],
+                aplicar=self._aplicar_ponto)
+
+        # Caminho rápido de colisão: roda na captura, antes da detecção completa
+        config = dict(self.perfil["perigo"])
+        config["mensagem"] = config["mensagem"] or self.frases.alerta_obstaculo
+        if perigo is not None:
+            config["ativo"] = perigo
+        self.perigo = criar_perigo(config, alertar=self._alertar_perigo)
+
+        tela = self.perfil["tela"]
+        self.cores = CORES_DISTANCIA if tela["cores"] == "distancia" else CORES_ALERTA
+
+        # Frases fixas sintetizadas em segundo plano para o cache de voz
+        fixas = ["Carregando"] + [m for m in (self.mensagens["ativado"],
+                                              self.mensagens["desativado"]) if m]
+        if self.perigo is not None:
+            # O alerta de colisão nunca deve esperar pela síntese
+            fixas.insert(0, self.perigo.mensagem)
+        self.cache_voz.aquecer(fixas + self.frases.vocabulario(), self.frases.separador)
+
+        self.partida.marcar("pronto")
+        if self.mensagens["pronto"]:
+            print(self.mensagens["pronto"])
+
+    def speak(self, text, prioridade=NORMAL):
+        """Enfileira a fala no worker de voz"""
+        self.fala.falar(text, prioridade)
+        if self.gravador is not None:
+            self.gravador.anuncio(text, prioridade)
+
+    def processar(self, dados, shape):
+        """Array (N, 6) do detector -> LoteDeteccoes do perfil"""
+        detections = self.pos.processar(dados, shape)
+        return detections.ordenar() if self.ordenar else detections
+
+    def detect_objects(self, frame):
+        if self.estimador is not None:
+            # Modelo de profundidade roda à parte e só quando lhe convém
+            self.estimador.observar(frame)
+        t = time.time()
+        inicio = time.perf_counter()
+        with METRICAS.cronometrar("inferencia"):
+            dados = self.detector.detectar([frame])[0]
+        meio = time.perf_counter()
+        if self.qualidade is not None:
+            self.qualidade.observar(meio - inicio)
+        with METRICAS.cronometrar("pos_processamento"):
+            detections = self.processar(dados, frame.shape)
+        if self.gravador is not None:
+            self.gravador.quadro(frame, t, detections, meio - inicio, time.perf_counter() - meio)
+        return detections
+
+    def detect_batch(self, frames):
+        """Detecção de vários frames em uma única chamada ao modelo"""
+        with METRICAS.cronometrar("inferencia_lote"):
+            lote = self.detector.detectar(frames)
+        with METRICAS.cronometrar("pos_processamento"):
+            return [self.processar(dados, f.shape) for dados, f in zip(lote, frames)]
+
+    def announce(self, detections, reaproveitado=False):
+        """Anuncia o resumo da cena (ou, no modo "evento", o evento mais importante)
+
+        `reaproveitado`: resultado anterior reenviado em cena parada.
+        """
+        self.partida.marcar("primeira_deteccao")
+        if self.anunciador.anunciar(detections, time.time(), reaproveitado):
+            self.partida.marcar("primeiro_anuncio")
+
+    def render(self, frame, detections):
+        """Desenha as últimas detecções e os textos do perfil no frame mais recente"""
+        tela = self.perfil["tela"]
+        if detections is not None:
+            # Caixas propagadas pela velocidade das trilhas até agora
+            detections = self.rastreador.prever(time.time())
+            for name, (x1, y1, x2, y2), distance, conf in detections.linhas():
+                color = self.cores[distance]
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+
+                label = tela["rotulo"].format(nome=name, distancia=DISTANCIAS[distance], conf=conf)
+                cv2.putText(frame, label, (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+        for texto in tela["textos"]:
+            cv2.putText(frame, texto["texto"].format(tts=self.tts_type.upper()),
+                        tuple(texto["posicao"]), cv2.FONT_HERSHEY_SIMPLEX,
+                        texto.get("escala", 0.6), tuple(texto.get("cor", (255, 255, 255))), 2)
+
+        return frame
+
+    def _aplicar_ponto(self, ponto):
+        """Efetiva um ponto de operação do controle de qualidade"""
+        if self.pipeline is not None:
+            self.pipeline.intervalo_min = ponto["intervalo"]
+        if ponto["modelo"] == self.modelo:
+            self.detector.definir_imgsz(ponto["imgsz"])
+        else:
+            # Carregar outro modelo demora: o atual segue detectando até a troca
+            threading.Thread(target=self._trocar_modelo, daemon=True).start()
+
+    def _trocar_modelo(self):
+        with self._troca:
+            # Pode ter havido outra transição enquanto esperava
+            ponto = self.qualidade.ponto
+            if ponto["modelo"] == self.modelo:
+                self.detector.definir_imgsz(ponto["imgsz"])
+                return
+            try:
+                detector = carregar_detector(self.backend, ponto["modelo"], imgsz=ponto["imgsz"],
+                                             avisar=self._avisar_urgente, **self._carga)
+            except Exception as e:
+                print(f"Erro ao carregar {ponto['modelo']}: {e}")
+                # Volta ao ponto do modelo que continua carregado e não tenta este de novo
+                pontos = self.qualidade.pontos
+                falhos = [i for i, p in enumerate(pontos) if p["modelo"] == ponto["modelo"]]
+                volta = ponto_inicial(pontos, self.modelo, self.detector.imgsz)
+                self.qualidade.descartar(falhos, volta, f"{ponto['modelo']} nao carregou")
+                return
+            detector.definir_classes(self.pos.ids_permitidos())
+            antigo, self.detector = self.detector, detector
+            self.modelo = ponto["modelo"]
+            antigo.fechar()
+
+    def _alertar_perigo(self, texto):
+        """Alerta do caminho rápido: fura a fila e o intervalo dos anúncios"""
+        self.speak(texto, URGENTE)
+        self.partida.marcar("primeiro_anuncio")
+
+    def _abrir_camera(self):
+        """Câmera com reconexão automática (avisos falados pelo worker de voz)"""
+        cap = GerenciadorCamera(0, avisar=self._avisar_urgente)
+        cap.abrir()
+        return cap
+
+    def _avisar_urgente(self, texto):
+        # Sem câmera ou detector o usuário fica sem alertas: o aviso fura a fila
+        fala = getattr(self, "fala", None)
+        if fala is not None:
+            fala.falar(texto, URGENTE)
+
+    def run(self, headless=False, portao=None, gravador=None):
+        """Executa o assistente até 'q', sinal ou encerramento da câmera
+
+        Com `gravador` (gravacao.Gravador), a sessão é registrada para replay.
+        """
+        self.gravador = gravador
+        # Câmera aberta durante a partida (ou agora, se não foi pedida)
+        cap = self.cap or self._abrir_camera()
+
+        print("Assistente iniciado!" if headless else "Assistente iniciado! Pressione 'q' para sair")
+        self.speak(self.mensagens["ativado"])
+
+        # Fração máxima do tempo ocupada pela inferência
+        # Sem interface o desenho nem é chamado
+        desenhar = None if headless else self.render
+        pipeline = Pipeline(cap, self.detect_objects, self.announce, desenhar, self.nome,
+                            ocupacao_max=self.perfil["ritmo"]["ocupacao_max"], portao=portao,
+                            rapido=self.perigo.processar if self.perigo is not None else None)
+        self.pipeline = pipeline
+        if self.qualidade is not None:
+            pipeline.intervalo_min = self.qualidade.ponto["intervalo"]
+            self.qualidade.iniciar()
+
+        try:
+            pipeline.executar()
+        except KeyboardInterrupt:
+            print("\nEncerrando...")
+        finally:
+            if self.qualidade is not None:
+                self.qualidade.parar()
+            pipeline.parar()
+            cap.release()
+            if not headless:
+                cv2.destroyAllWindows()
+            if self.estimador is not None:
+                self.estimador.fechar()
+            self.detector.fechar()
+            if self.mensagens["desativado"]:
+                self.speak(self.mensagens["desativado"])
+            if self.gravador is not None:
+                self.gravador.fechar()
+                self.gravador = None
+            self.fala.encerrar()
+
+
+def criar_parser(descricao, perfil=None):
+    """Linha de comando comum; --perfil troca o arquivo de perfil"""
+    parser = argparse.ArgumentParser(description=descricao)
+    parser.add_argument("--perfil", default=perfil, required=perfil is None,
+                        help="nome em perfis/ ou caminho de um arquivo .toml/.yaml")
+    adicionar_argumentos(parser)
+    metricas.adicionar_argumentos(parser)
+    pipeline.adicionar_argumentos(parser)
+    movimento.adicionar_argumentos(parser)
+    gravacao.adicionar_argumentos(parser)
+    qualidade.adicionar_argumentos(parser)
+    perigo.adicionar_argumentos(parser)
+    return parser
+
+
+def main(classe=Assistente, descricao="Assistente de acessibilidade"):
+    args = criar_parser(descricao, classe.PERFIL if classe is not Assistente else None).parse_args()
+    metricas.configurar(args)
+
+    assistente = classe(args.backend, args.modelo, args.threads,
+                        imgsz=args.imgsz, roi=args.roi or None, perfil=args.perfil,
+                        processo=args.processo or None, qualidade=args.qualidade_auto or None,
+                        perigo=False if args.sem_perigo else None)
+    assistente.run(args.headless, movimento.criar_portao(args),
+                   gravacao.criar_gravador(args, assistente.perfil))
+
+
+if __name__ == "__main__":
+    main()
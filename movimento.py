@@ -0,0 +1,75 @@
+"""
+Portão de movimento: só roda o detector quando a cena muda
+"""
+import time
+
+import cv2
+import numpy as np
+
+METODOS = ("diferenca", "mog2", "desligado")
+
+
+class PortaoMovimento:
+    """Compara o frame atual, reduzido, com o da última inferência
+
+    A inferência roda quando a fração de pixels alterados passa de `limiar`
+    ou quando o último resultado tem mais de `idade_max` segundos.
+    """
+
+    def __init__(self, metodo="diferenca", limiar=0.01, limiar_pixel=25,
+                 idade_max=2.0, tamanho=(160, 120)):
+        self.metodo = metodo
+        self.limiar = limiar
+        self.limiar_pixel = limiar_pixel
+        self.idade_max = idade_max
+        self.tamanho = tamanho
+
+        self._referencia = None
+        self._ultima = 0.0
+        self.mudanca = 0.0
+
+        if metodo == "mog2":
+            self._fundo = cv2.createBackgroundSubtractorMOG2(
+                history=200, varThreshold=32, detectShadows=False)
+
+    def _reduzir(self, frame):
+        cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        pequeno = cv2.resize(cinza, self.tamanho, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(pequeno, (5, 5), 0)
+
+    def precisa_inferir(self, frame):
+        """True se houve movimento relevante ou o resultado expirou"""
+        if self.metodo == "desligado":
+            return True
+
+        pequeno = self._reduzir(frame)
+
+        if self.metodo == "mog2":
+            # O modelo de fundo aprende em todo frame; conta só o primeiro plano
+            mascara = self._fundo.apply(pequeno)
+            self.mudanca = np.count_nonzero(mascara) / mascara.size
+        elif self._referencia is None:
+            self.mudanca = 1.0
+        else:
+            diferenca = cv2.absdiff(pequeno, self._referencia)
+            self.mudanca = np.count_nonzero(diferenca > self.limiar_pixel) / diferenca.size
+
+        if self.mudanca > self.limiar or time.time() - self._ultima > self.idade_max:
+            self._referencia = pequeno
+            self._ultima = time.time()
+            return True
+        return False
+
+
+def adicionar_argumentos(parser):
+    parser.add_argument("--movimento", choices=METODOS, default="diferenca",
+                        help="deteccao de mudanca antes do YOLO")
+    parser.add_argument("--limiar-movimento", type=float, default=0.01,
+                        help="fracao de pixels alterados que dispara a inferencia")
+    parser.add_argument("--idade-max", type=float, default=2.0,
+                        help="segundos maximos reaproveitando o ultimo resultado")
+
+
+def criar_portao(args):
+    return PortaoMovimento(args.movimento, limiar=args.limiar_movimento,
+                           idade_max=args.idade_max)
@@ -0,0 +1,75 @@
+"""
+Partida em etapas: aviso falado imediato, câmera e modelo carregando em paralelo
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Referência do cold start: os scripts importam este módulo antes dos demais
+INICIO = time.perf_counter()
+
+import numpy as np
+
+from metricas import METRICAS
+
+
+def carregar_detector(backend="pytorch", modelo="yolov8n.pt", threads=None, imgsz=None,
+                      roi=False, repeticoes=2, processo=False, avisar=None):
+    """Cria o detector (o import do torch/ultralytics acontece aqui) e o aquece
+
+    As primeiras inferências pagam alocações, autotuning e otimização do grafo;
+    feitas em um frame vazio durante a partida, não atrasam o primeiro anúncio.
+    """
+    from detector import criar_detector
+
+    detector = criar_detector(backend, modelo, threads, imgsz, roi, processo, avisar)
+    frame = np.zeros((480, 640, 3), np.uint8)
+    with METRICAS.cronometrar("aquecimento_modelo"):
+        for _ in range(repeticoes):
+            detector.detectar([frame])
+    return detector
+
+
+class Partida:
+    """Marcos do cold start em segundos desde o início do processo
+
+    Cada marco é registrado uma única vez, impresso e exposto como medidor
+    `partida_<nome>_s` nas métricas.
+    """
+
+    def __init__(self):
+        self.marcos = {}
+        self._lock = threading.Lock()
+
+    def marcar(self, nome):
+        if nome in self.marcos:
+            return
+        with self._lock:
+            if nome in self.marcos:
+                return
+            self.marcos[nome] = segundos = round(time.perf_counter() - INICIO, 3)
+        METRICAS.definir(f"partida_{nome}_s", segundos)
+        print(f"Partida: {nome} em {segundos:.2f} s")
+
+    def _etapa(self, nome, funcao):
+        resultado = funcao()
+        self.marcar(nome)
+        return resultado
+
+    def iniciar(self, **etapas):
+        """Dispara as etapas em threads e retorna sem esperar
+
+        Etapas None são puladas (resultado None em `aguardar`).
+        """
+        ativas = {nome: f for nome, f in etapas.items() if f is not None}
+        self._resultados = dict.fromkeys(etapas)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(ativas)))
+        self._futuros = {nome: self._executor.submit(self._etapa, nome, f)
+                         for nome, f in ativas.items()}
+
+    def aguardar(self):
+        """Espera as etapas e retorna {nome: resultado}; exceções são repassadas"""
+        self._executor.shutdown(wait=True)
+        for nome, futuro in self._futuros.items():
+            self._resultados[nome] = futuro.result()
+        return self._resultados
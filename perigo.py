@@ -0,0 +1,163 @@
+"""
+Alerta rápido de obstáculo: expansão do fluxo óptico à frente, em todo frame, antes do YOLO
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from metricas import METRICAS
+
+MENSAGEM = "Cuidado, obstaculo a frente"
+
+
+class DetectorAproximacao:
+    """Detecta algo crescendo rápido na zona "frente" (looming)
+
+    O terço central do frame, reduzido a `tamanho` pixels em cinza, passa por
+    fluxo óptico denso (Farneback) contra o frame anterior. Um ajuste de
+    mínimos quadrados do campo ao redor do centro dá a taxa de expansão;
+    translação (virar a cabeça) cai na média e não conta. Tempo até o contato
+    = 1 / taxa; abaixo de `ttc_alerta` por `confirmacoes` frames seguidos
+    dispara `alertar(mensagem)`, no máximo um alerta a cada `intervalo`.
+
+    Não sabe o que é o obstáculo (parede e poste também contam), e por isso
+    mesmo não espera o detector: custa poucos milissegundos por frame.
+    `slo_ms` é o orçamento do estágio; frames acima dele contam em
+    `slo_perigo_violado`. `expansao_min` é a menor escala por frame levada
+    a sério.
+    """
+
+    def __init__(self, ttc_alerta=1.5, confirmacoes=2, intervalo=3.0, expansao_min=0.005,
+                 zona=(1 / 3, 0.2, 2 / 3, 1.0), tamanho=(64, 96), slo_ms=20.0,
+                 lacuna_max=0.5, mensagem=MENSAGEM, alertar=None):
+        self.ttc_alerta = ttc_alerta
+        self.confirmacoes = confirmacoes
+        self.intervalo = intervalo
+        self.expansao_min = expansao_min
+        self.zona = zona
+        self.tamanho = tuple(tamanho)
+        self.slo = slo_ms / 1000.0
+        self.lacuna_max = lacuna_max
+        self.mensagem = mensagem
+        self.alertar = alertar
+
+        # Coordenadas relativas ao centro da zona reduzida, para o ajuste
+        w, h = self.tamanho
+        y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+        self._x = (x - (w - 1) / 2).ravel()
+        self._y = (y - (h - 1) / 2).ravel()
+        self._norma = float(np.dot(self._x, self._x) + np.dot(self._y, self._y))
+
+        self._anterior = None
+        self._t_anterior = 0.0
+        self._seguidos = 0
+        self._ultimo_alerta = float("-inf")
+        self.ttc = float("inf")
+        self.alertas = 0
+
+    def _reduzir(self, frame):
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = self.zona
+        recorte = frame[int(y1 * h):int(y2 * h), int(x1 * w):int(x2 * w)]
+        cinza = cv2.cvtColor(recorte, cv2.COLOR_BGR2GRAY) if recorte.ndim == 3 else recorte
+        return cv2.resize(cinza, self.tamanho, interpolation=cv2.INTER_AREA)
+
+    def expansao(self, anterior, atual):
+        """Escala relativa entre dois frames reduzidos (0 = parado, >0 = crescendo)"""
+        fluxo = cv2.calcOpticalFlowFarneback(anterior, atual, None, 0.5, 2, 9, 2, 5, 1.1, 0)
+        u = fluxo[..., 0].ravel()
+        v = fluxo[..., 1].ravel()
+        # u = s*x + tx, v = s*y + ty: a média remove (tx, ty)
+        return float((np.dot(u - u.mean(), self._x) + np.dot(v - v.mean(), self._y)) / self._norma)
+
+    def processar(self, frame, t):
+        """Chamado a cada frame capturado (t = time.time() da captura); True se alertou"""
+        inicio = time.perf_counter()
+        atual = self._reduzir(frame)
+        anterior, t_anterior = self._anterior, self._t_anterior
+        self._anterior, self._t_anterior = atual, t
+        # Sem frame anterior recente (início, câmera reconectando) não há fluxo a medir
+        if anterior is None or not 0 < t - t_anterior <= self.lacuna_max:
+            return False
+
+        # Abaixo de expansao_min o fluxo é só ruído (sensor, compressão)
+        escala = self.expansao(anterior, atual)
+        self.ttc = (t - t_anterior) / escala if escala > self.expansao_min else float("inf")
+
+        # Um frame só pode ser ruído de fluxo; exige alguns seguidos
+        self._seguidos = self._seguidos + 1 if self.ttc < self.ttc_alerta else 0
+
+        alertou = False
+        if self._seguidos >= self.confirmacoes and t - self._ultimo_alerta > self.intervalo:
+            self._ultimo_alerta = t
+            self._seguidos = 0
+            self.alertas += 1
+            alertou = True
+            METRICAS.incrementar("alertas_perigo")
+            if self.alertar is not None:
+                self.alertar(self.mensagem)
+            # Da captura do frame até o alerta entrar na fila de voz
+            METRICAS.observar("latencia_alerta_perigo", time.time() - t)
+
+        duracao = time.perf_counter() - inicio
+        METRICAS.observar("perigo", duracao)
+        if duracao > self.slo:
+            METRICAS.incrementar("slo_perigo_violado")
+        return alertou
+
+
+def criar_detector(config, alertar=None):
+    """DetectorAproximacao da seção [perigo] do perfil, ou None se desligado"""
+    if not config["ativo"]:
+        return None
+    return DetectorAproximacao(ttc_alerta=config["ttc_alerta"],
+                               confirmacoes=config["confirmacoes"],
+                               intervalo=config["intervalo"],
+                               expansao_min=config["expansao_min"],
+                               slo_ms=config["slo_ms"], mensagem=config["mensagem"] or MENSAGEM,
+                               alertar=alertar)
+
+
+def adicionar_argumentos(parser):
+    parser.add_argument("--sem-perigo", action="store_true",
+                        help="desliga o alerta rapido de obstaculo por fluxo optico")
+
+
+if __name__ == "__main__":
+    # Benchmark do estágio isolado: custo por frame contra o SLO e alertas no vídeo
+    from benchmark import FonteReplay, percentis
+
+    parser = argparse.ArgumentParser(description="Latencia do alerta rapido de obstaculo")
+    parser.add_argument("fonte", help="arquivo de video ou diretorio de imagens")
+    parser.add_argument("--slo-ms", type=float, default=20.0)
+    parser.add_argument("--ttc", type=float, default=1.5, help="tempo ate o contato que alerta (s)")
+    parser.add_argument("--max-frames", type=int, default=None)
+    args = parser.parse_args()
+
+    fonte = FonteReplay(args.fonte)
+    alertas = []
+    detector = DetectorAproximacao(ttc_alerta=args.ttc, slo_ms=args.slo_ms,
+                                   alertar=lambda texto: alertas.append(frames))
+    tempos = []
+    frames = 0
+    try:
+        while args.max_frames is None or frames < args.max_frames:
+            ret, frame = fonte.read()
+            if not ret:
+                break
+            # Tempo do vídeo, não do relógio: o TTC não depende da velocidade do replay
+            inicio = time.perf_counter()
+            detector.processar(frame, frames / fonte.fps)
+            tempos.append(time.perf_counter() - inicio)
+            frames += 1
+    finally:
+        fonte.release()
+
+    resumo = percentis(tempos[1:])
+    if resumo:
+        dentro = resumo["p99"] <= args.slo_ms
+        print(f"Frames: {frames}  p50 {resumo['p50']:.2f} ms  p99 {resumo['p99']:.2f} ms  "
+              f"max {resumo['max']:.2f} ms  SLO {args.slo_ms:.0f} ms: {'ok' if dentro else 'ESTOURADO'}")
+    print(f"Alertas: {len(alertas)} (frames {', '.join(map(str, alertas)) or '-'})")
@@ -0,0 +1,236 @@
+"""
+Pipeline desacoplado: captura, inferência e exibição/anúncio em estágios separados
+"""
+import signal
+import threading
+import time
+
+import cv2
+
+from metricas import METRICAS
+
+
+class FilaUltimo:
+    """Fila limitada a um item: o item mais recente substitui o anterior"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._fechada = False
+        self.descartados = 0
+
+    def colocar(self, item):
+        """Retorna True se um item antigo foi descartado"""
+        with self._cond:
+            descartou = self._item is not None
+            if descartou:
+                self.descartados += 1
+            self._item = item
+            self._cond.notify()
+            return descartou
+
+    def pegar(self, timeout=None):
+        """Retorna o item mais recente ou None se expirar/fechar"""
+        with self._cond:
+            if self._item is None and not self._fechada:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def fechar(self):
+        with self._cond:
+            self._fechada = True
+            self._cond.notify_all()
+
+
+class Pipeline:
+    """Captura -> inferência -> exibição/anúncio, sempre no frame mais recente
+
+    Com `desenhar=None` o pipeline roda sem interface: nada é desenhado nem
+    exibido e o encerramento vem de SIGINT/SIGTERM em vez da tecla 'q'.
+
+    `anunciar(detections, reaproveitado)` recebe cada resultado; em cena
+    parada (portão de movimento) o último resultado é reenviado com
+    `reaproveitado=True`, e não é uma detecção nova.
+
+    `rapido(frame, t)` roda na própria captura, em todo frame, antes da
+    inferência: é o caminho do alerta de colisão, que não pode esperar o
+    detector nem o intervalo entre inferências.
+    """
+
+    def __init__(self, cap, detectar, anunciar, desenhar, titulo,
+                 ocupacao_max=0.5, intervalo_min=0.0, portao=None, intervalo_portao=1 / 15,
+                 rapido=None):
+        self.cap = cap
+        self.detectar = detectar
+        self.anunciar = anunciar
+        self.desenhar = desenhar
+        self.titulo = titulo
+
+        # Fração máxima do tempo que a inferência pode ocupar
+        self.ocupacao_max = ocupacao_max
+        self.intervalo_min = intervalo_min
+
+        # Portão de movimento: cena parada reaproveita as últimas detecções
+        self.portao = portao
+        self.intervalo_portao = intervalo_portao
+        self._ultimo_resultado = None
+
+        self.rapido = rapido
+
+        self.fila_inferencia = FilaUltimo()
+        self.fila_exibicao = FilaUltimo()
+        self.fila_resultados = FilaUltimo()
+
+        self.parado = threading.Event()
+        self.falha_captura = False
+        self.tempo_inferencia = 0.0
+        self._threads = []
+
+    def _capturar(self):
+        while not self.parado.is_set():
+            with METRICAS.cronometrar("captura"):
+                ret, frame = self.cap.read()
+            if not ret:
+                # GerenciadorCamera reconectando: segue esperando o próximo frame
+                if not getattr(self.cap, "encerrada", True):
+                    continue
+                print("Erro ao capturar frame")
+                METRICAS.incrementar("falhas_captura")
+                self.falha_captura = True
+                self.parado.set()
+                break
+
+            t = time.time()
+            if self.rapido is not None:
+                try:
+                    self.rapido(frame, t)
+                except Exception as e:
+                    print(f"Erro no alerta rapido: {e}")
+                    METRICAS.incrementar("erros_perigo")
+            if self.fila_inferencia.colocar((frame, t)):
+                METRICAS.incrementar("frames_descartados")
+            if self.desenhar is not None:
+                self.fila_exibicao.colocar((frame, t))
+
+        self.fila_inferencia.fechar()
+        self.fila_exibicao.fechar()
+
+    def _intervalo(self):
+        """Pausa entre inferências proporcional ao tempo medido"""
+        if not self.tempo_inferencia:
+            return self.intervalo_min
+        ocioso = self.tempo_inferencia * (1 - self.ocupacao_max) / self.ocupacao_max
+        return max(self.intervalo_min, ocioso)
+
+    def _inferir(self):
+        while not self.parado.is_set():
+            item = self.fila_inferencia.pegar(timeout=0.5)
+            if item is None:
+                continue
+
+            frame, t_frame = item
+
+            if (self.portao is not None and not self.portao.precisa_inferir(frame)
+                    and self._ultimo_resultado is not None):
+                # Reenvia o resultado anterior, marcado, para manter as trilhas vivas
+                METRICAS.incrementar("inferencias_evitadas")
+                self.fila_resultados.colocar((self._ultimo_resultado, t_frame, True))
+                self.parado.wait(max(self.intervalo_min, self.intervalo_portao))
+                continue
+
+            inicio = time.perf_counter()
+            try:
+                detections = self.detectar(frame)
+            except Exception as e:
+                print(f"Erro na inferência: {e}")
+                METRICAS.incrementar("erros_inferencia")
+                continue
+            duracao = time.perf_counter() - inicio
+
+            # Média móvel do tempo de inferência
+            if self.tempo_inferencia:
+                self.tempo_inferencia = 0.8 * self.tempo_inferencia + 0.2 * duracao
+            else:
+                self.tempo_inferencia = duracao
+            METRICAS.definir("intervalo_inferencia_s", round(self._intervalo(), 4))
+
+            self._ultimo_resultado = detections
+            self.fila_resultados.colocar((detections, t_frame, False))
+
+            # Frames que chegarem durante a pausa são substituídos pelo mais novo
+            self.parado.wait(self._intervalo())
+
+        self.fila_resultados.fechar()
+
+    def iniciar(self):
+        for alvo in (self._capturar, self._inferir):
+            t = threading.Thread(target=alvo, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    @property
+    def headless(self):
+        return self.desenhar is None
+
+    def instalar_sinais(self):
+        """SIGINT/SIGTERM (e SIGBREAK no Windows) encerram o pipeline"""
+        def encerrar(signum, frame):
+            print("\nEncerrando...")
+            self.parado.set()
+
+        for nome in ("SIGINT", "SIGTERM", "SIGBREAK"):
+            if hasattr(signal, nome):
+                signal.signal(getattr(signal, nome), encerrar)
+
+    def _anunciar_resultado(self, timeout):
+        resultado = self.fila_resultados.pegar(timeout=timeout)
+        if resultado is None:
+            return None
+
+        detections, t_frame, reaproveitado = resultado
+        with METRICAS.cronometrar("anuncio"):
+            self.anunciar(detections, reaproveitado)
+        if not reaproveitado:
+            # Do frame capturado até a decisão de anúncio (só detecções novas)
+            METRICAS.observar("latencia_frame_anuncio", time.time() - t_frame)
+        return detections
+
+    def executar(self):
+        """Anuncia (e exibe, se houver interface) até 'q', sinal ou falha da câmera"""
+        self.iniciar()
+
+        if self.headless:
+            self.instalar_sinais()
+            while not self.parado.is_set():
+                self._anunciar_resultado(timeout=0.5)
+            return
+
+        ultimas = None
+        while not self.parado.is_set():
+            detections = self._anunciar_resultado(timeout=0)
+            if detections is not None:
+                ultimas = detections
+
+            item = self.fila_exibicao.pegar(timeout=0.1)
+            if item is None:
+                continue
+
+            with METRICAS.cronometrar("desenho"):
+                frame = self.desenhar(item[0].copy(), ultimas)
+            cv2.imshow(self.titulo, frame)
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+    def parar(self):
+        self.parado.set()
+        self.fila_inferencia.fechar()
+        self.fila_exibicao.fechar()
+        for t in self._threads:
+            t.join(timeout=2)
+
+
+def adicionar_argumentos(parser):
+    parser.add_argument("--headless", action="store_true",
+                        help="sem janela nem desenho; encerra com SIGINT/SIGTERM")
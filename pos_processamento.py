@@ -0,0 +1,149 @@
+"""
+Pós-processamento vetorizado das detecções YOLO
+"""
+import numpy as np
+
+# Códigos das colunas categóricas do lote
+ESQUERDA, FRENTE, DIREITA = 0, 1, 2
+MUITO_PROXIMO, PROXIMO, DISTANTE = 0, 1, 2
+
+POSICOES = ("esquerda", "frente", "direita")
+DISTANCIAS = ("muito proximo", "proximo", "distante")
+
+
+class LoteDeteccoes:
+    """Detecções de um frame em formato colunar (uma linha por objeto)"""
+
+    __slots__ = ('bbox', 'confianca', 'classe', 'area_ratio',
+                 'posicao', 'distancia', 'nomes', 'metros', 'ttc')
+
+    def __init__(self, bbox, confianca, classe, area_ratio, posicao, distancia, nomes,
+                 metros=None, ttc=None):
+        n = len(confianca)
+        self.bbox = bbox              # (N, 4) int32 - x1, y1, x2, y2
+        self.confianca = confianca    # (N,) float32
+        self.classe = classe          # (N,) int32 - id COCO
+        self.area_ratio = area_ratio  # (N,) float32
+        self.posicao = posicao        # (N,) int8 - ESQUERDA/FRENTE/DIREITA
+        self.distancia = distancia    # (N,) int8 - MUITO_PROXIMO/PROXIMO/DISTANTE
+        self.nomes = nomes            # id COCO -> nome no idioma do perfil
+        # (N,) float32 - distância estimada em metros (NaN se desconhecida)
+        self.metros = np.full(n, np.nan, np.float32) if metros is None else metros
+        # (N,) float32 - segundos até o contato, preenchido pelo rastreador (inf se não se aproxima)
+        self.ttc = np.full(n, np.inf, np.float32) if ttc is None else ttc
+
+    @classmethod
+    def vazio(cls, nomes=()):
+        return cls(
+            np.zeros((0, 4), np.int32), np.zeros(0, np.float32),
+            np.zeros(0, np.int32), np.zeros(0, np.float32),
+            np.zeros(0, np.int8), np.zeros(0, np.int8), nomes
+        )
+
+    def __len__(self):
+        return len(self.confianca)
+
+    def selecionar(self, indices):
+        """Retorna um novo lote apenas com as linhas indicadas"""
+        return LoteDeteccoes(
+            self.bbox[indices], self.confianca[indices], self.classe[indices],
+            self.area_ratio[indices], self.posicao[indices],
+            self.distancia[indices], self.nomes,
+            self.metros[indices], self.ttc[indices]
+        )
+
+    def ordenar(self):
+        """Ordena por área (mais próximo primeiro)"""
+        return self.selecionar(np.argsort(-self.area_ratio, kind='stable'))
+
+    def maior(self):
+        """Índice do objeto com maior área"""
+        return int(np.argmax(self.area_ratio))
+
+    def nome(self, i):
+        return self.nomes[self.classe[i]]
+
+    def posicao_texto(self, i):
+        return POSICOES[self.posicao[i]]
+
+    def distancia_texto(self, i):
+        return DISTANCIAS[self.distancia[i]]
+
+    def linhas(self):
+        """Itera (nome, bbox, distancia, confianca) convertendo os arrays uma única vez"""
+        nomes = self.nomes
+        return zip(
+            [nomes[c] for c in self.classe.tolist()],
+            [tuple(b) for b in self.bbox.tolist()],
+            self.distancia.tolist(),
+            self.confianca.tolist()
+        )
+
+
+class PosProcessador:
+    """Filtra e classifica todas as caixas de um frame com operações de array"""
+
+    def __init__(self, names, classes, conf_min=0.5,
+                 limiar_muito_proximo=0.2, limiar_proximo=0.1, estimador=None):
+        self.conf_min = conf_min
+        self.limiar_muito_proximo = limiar_muito_proximo
+        self.limiar_proximo = limiar_proximo
+        # EstimadorDistancia opcional; sem ele a distância vem só da área
+        self.estimador = estimador
+
+        # Tabela id COCO -> nome no idioma do perfil (None fora da lista)
+        total = max(names) + 1
+        self.nomes = tuple(classes.get(names.get(i)) for i in range(total))
+        self.permitidas = np.array([nome is not None for nome in self.nomes], dtype=bool)
+
+    def ids_permitidos(self):
+        """Ids COCO da lista de classes, para o detector filtrar de antemão"""
+        return np.flatnonzero(self.permitidas).tolist()
+
+    def processar(self, dados, shape):
+        """Converte o array (N, 6) de um detector em um LoteDeteccoes"""
+        # Colunas: x1, y1, x2, y2, conf, cls
+        if len(dados) == 0:
+            return LoteDeteccoes.vazio(self.nomes)
+        return self.processar_arrays(dados[:, :4], dados[:, 4], dados[:, 5], shape)
+
+    def processar_arrays(self, xyxy, conf, cls, shape):
+        """Processa arrays brutos (N, 4), (N,), (N,) de um frame"""
+        h, w = shape[:2]
+
+        conf = np.asarray(conf, dtype=np.float32)
+        cls = np.asarray(cls).astype(np.int32)
+
+        # Confiança e lista de classes em uma única máscara
+        valido = (conf > self.conf_min) & (cls >= 0) & (cls < len(self.permitidas))
+        valido[valido] = self.permitidas[cls[valido]]
+
+        if not valido.any():
+            return LoteDeteccoes.vazio(self.nomes)
+
+        bbox = np.asarray(xyxy)[valido].astype(np.int32)
+        conf = conf[valido]
+        cls = cls[valido]
+
+        x1, y1, x2, y2 = bbox[:, 0], bbox[:, 1], bbox[:, 2], bbox[:, 3]
+
+        # Posição pelos terços da imagem
+        center_x = (x1 + x2) // 2
+        posicao = np.full(len(bbox), FRENTE, dtype=np.int8)
+        posicao[center_x < w // 3] = ESQUERDA
+        posicao[center_x > 2 * w // 3] = DIREITA
+
+        # Distância pela fração da área ocupada
+        area_ratio = ((x2 - x1) * (y2 - y1) / float(w * h)).astype(np.float32)
+        distancia = np.full(len(bbox), DISTANTE, dtype=np.int8)
+        distancia[area_ratio > self.limiar_proximo] = PROXIMO
+        distancia[area_ratio > self.limiar_muito_proximo] = MUITO_PROXIMO
+
+        metros = None
+        if self.estimador is not None:
+            # Onde há estimativa métrica ela substitui a faixa pela área
+            metros = self.estimador.estimar(bbox, cls, shape)
+            conhecida = np.isfinite(metros)
+            distancia[conhecida] = self.estimador.classificar(metros[conhecida])
+
+        return LoteDeteccoes(bbox, conf, cls, area_ratio, posicao, distancia, self.nomes, metros)
@@ -0,0 +1,239 @@
+"""
+Inferência em processo próprio: frames por memória compartilhada, worker reiniciado se cair ou travar
+"""
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from detector import Detector
+from metricas import METRICAS
+
+
+def _anexar(nome):
+    """Abre o bloco criado pelo processo principal sem assumir sua remoção"""
+    try:
+        return shared_memory.SharedMemory(name=nome, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=nome)
+
+
+def _trabalhador(config, classes, entrada, saida):
+    """Laço do processo de inferência (importa torch/onnxruntime só aqui)"""
+    from partida import carregar_detector
+
+    detector = carregar_detector(**config)
+    detector.definir_classes(classes)
+    saida.put(("pronto", detector.names))
+
+    memoria = None
+    while True:
+        mensagem = entrada.get()
+        if mensagem is None:
+            break
+
+        tipo = mensagem[0]
+        if tipo == "memoria":
+            if memoria is not None:
+                memoria.close()
+            memoria = _anexar(mensagem[1])
+        elif tipo == "classes":
+            detector.definir_classes(mensagem[1])
+        elif tipo == "imgsz":
+            detector.definir_imgsz(mensagem[1])
+        elif tipo == "detectar":
+            _, seq, posicoes = mensagem
+            # Views sem cópia sobre os slots do anel
+            frames = [np.ndarray(shape, np.uint8, buffer=memoria.buf, offset=offset)
+                      for offset, shape in posicoes]
+            try:
+                saida.put(("resultado", seq, detector.detectar(frames)))
+            except Exception as e:
+                saida.put(("erro", seq, str(e)))
+            del frames
+
+    if memoria is not None:
+        memoria.close()
+
+
+class DetectorProcesso(Detector):
+    """Detector rodando num processo filho supervisionado
+
+    Cada frame é copiado uma vez para o próximo slot de um anel em memória
+    compartilhada; o worker lê views NumPy sem cópia e devolve só as caixas
+    por uma fila. Inferência, pós-processamento, desenho e voz deixam de
+    disputar o mesmo GIL. Se o worker morre, o supervisor o reinicia (espera
+    exponencial entre tentativas); se não responde em `timeout_inferencia`, é
+    encerrado e reiniciado. Enquanto isso `detectar` levanta RuntimeError e o
+    pipeline apenas pula o frame.
+    """
+
+    def __init__(self, config, slots=4, timeout_inferencia=5.0, timeout_carga=300.0,
+                 backoff_inicial=0.5, backoff_max=10.0, avisar=None):
+        self.config = config
+        self.imgsz = config.get("imgsz") or 640
+        self.slots = slots
+        self.timeout_inferencia = timeout_inferencia
+        self.timeout_carga = timeout_carga
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.avisar = avisar
+
+        # spawn em todas as plataformas: fork com threads (câmera, voz) e torch não é seguro
+        self._contexto = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._pronto = threading.Event()
+        self._encerrado = threading.Event()
+        self._memoria = None
+        self._tamanho_slot = 0
+        self._proximo = 0
+        self._seq = 0
+        self.reinicios = 0
+
+        self._iniciar()
+        if not self._aguardar_pronto(timeout_carga):
+            self.fechar()
+            raise RuntimeError("Worker de inferencia nao iniciou")
+        threading.Thread(target=self._supervisionar, daemon=True).start()
+
+    def _iniciar(self):
+        """Novo processo com filas novas (as antigas podem ter ficado corrompidas)"""
+        self._entrada = self._contexto.Queue()
+        self._saida = self._contexto.Queue()
+        self._processo = self._contexto.Process(
+            target=_trabalhador, args=(self.config, self.classes, self._entrada, self._saida),
+            name="inferencia", daemon=True)
+        self._processo.start()
+        if self._memoria is not None:
+            self._entrada.put(("memoria", self._memoria.name))
+
+    def _aguardar_pronto(self, timeout):
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite and not self._encerrado.is_set():
+            try:
+                mensagem = self._saida.get(timeout=0.5)
+            except queue.Empty:
+                if not self._processo.is_alive():
+                    return False
+                continue
+            if mensagem[0] == "pronto":
+                self.names = mensagem[1]
+                self._pronto.set()
+                return True
+        return False
+
+    def _aviso(self, texto):
+        print(texto)
+        if self.avisar is not None:
+            self.avisar(texto)
+
+    def _supervisionar(self):
+        espera = self.backoff_inicial
+        while not self._encerrado.wait(0.5):
+            if self._processo.is_alive():
+                continue
+
+            self._pronto.clear()
+            self.reinicios += 1
+            METRICAS.incrementar("reinicios_worker")
+            print(f"Worker de inferencia parou (codigo {self._processo.exitcode})")
+            self._aviso("Detector reiniciando")
+
+            # O lock espera um detectar em andamento terminar antes da troca
+            with self._lock:
+                self._iniciar()
+            inicio = time.monotonic()
+            if self._aguardar_pronto(self.timeout_carga):
+                METRICAS.observar("worker_indisponivel", time.monotonic() - inicio)
+                self._aviso("Detector pronto")
+                espera = self.backoff_inicial
+            else:
+                self._processo.terminate()
+                self._encerrado.wait(espera)
+                espera = min(espera * 2, self.backoff_max)
+
+    def definir_classes(self, classes):
+        super().definir_classes(classes)
+        with self._lock:
+            self._entrada.put(("classes", self.classes))
+
+    def definir_imgsz(self, imgsz):
+        super().definir_imgsz(imgsz)
+        # Um worker reiniciado já sobe com o valor novo
+        self.config["imgsz"] = imgsz
+        with self._lock:
+            self._entrada.put(("imgsz", imgsz))
+
+    def _garantir_memoria(self, frames):
+        """Realoca o anel se os frames não cabem nos slots atuais"""
+        necessario = max(f.nbytes for f in frames)
+        if self._memoria is not None and necessario <= self._tamanho_slot and len(frames) <= self.slots:
+            return
+
+        self.slots = max(self.slots, len(frames))
+        self._tamanho_slot = -(-necessario // 64) * 64
+        antiga = self._memoria
+        self._memoria = shared_memory.SharedMemory(create=True, size=self.slots * self._tamanho_slot)
+        self._proximo = 0
+        self._entrada.put(("memoria", self._memoria.name))
+        if antiga is not None:
+            # O worker mantém o mapeamento antigo até ler a mensagem acima
+            antiga.close()
+            antiga.unlink()
+
+    def detectar(self, frames):
+        if not self._pronto.is_set():
+            raise RuntimeError("Worker de inferencia reiniciando")
+
+        with self._lock:
+            self._garantir_memoria(frames)
+            posicoes = []
+            for frame in frames:
+                offset = self._proximo * self._tamanho_slot
+                self._proximo = (self._proximo + 1) % self.slots
+                destino = np.ndarray(frame.shape, np.uint8, buffer=self._memoria.buf, offset=offset)
+                np.copyto(destino, frame)
+                posicoes.append((offset, frame.shape))
+                del destino
+
+            self._seq += 1
+            seq = self._seq
+            processo, saida = self._processo, self._saida
+            self._entrada.put(("detectar", seq, posicoes))
+
+            limite = time.monotonic() + self.timeout_inferencia
+            while True:
+                try:
+                    mensagem = saida.get(timeout=0.25)
+                except queue.Empty:
+                    if not processo.is_alive():
+                        raise RuntimeError("Worker de inferencia caiu")
+                    if time.monotonic() > limite:
+                        # O supervisor vê o processo morto e sobe outro
+                        METRICAS.incrementar("travamentos_worker")
+                        processo.terminate()
+                        raise RuntimeError("Worker de inferencia travado")
+                    continue
+
+                if mensagem[1] != seq:
+                    # Resposta atrasada de um pedido já abandonado
+                    continue
+                if mensagem[0] == "erro":
+                    raise RuntimeError(mensagem[2])
+                return mensagem[2]
+
+    def fechar(self):
+        self._encerrado.set()
+        self._pronto.clear()
+        with self._lock:
+            self._entrada.put(None)
+            self._processo.join(timeout=2)
+            if self._processo.is_alive():
+                self._processo.terminate()
+            if self._memoria is not None:
+                self._memoria.close()
+                self._memoria.unlink()
+                self._memoria = None
@@ -0,0 +1,263 @@
+"""
+Controle adaptativo de qualidade: troca resolução, modelo e intervalo para manter a latência no orçamento
+"""
+import glob
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from metricas import METRICAS
+
+# Do mais caro para o mais barato; intervalo = pausa mínima entre inferências (s)
+PONTOS = (
+    {"modelo": "yolov8s.pt", "imgsz": 640, "intervalo": 0.0},
+    {"modelo": "yolov8n.pt", "imgsz": 640, "intervalo": 0.0},
+    {"modelo": "yolov8n.pt", "imgsz": 480, "intervalo": 0.0},
+    {"modelo": "yolov8n.pt", "imgsz": 320, "intervalo": 0.0},
+    {"modelo": "yolov8n.pt", "imgsz": 320, "intervalo": 0.5},
+)
+
+
+class Sensores:
+    """Temperatura da CPU, carga e bateria; None quando a plataforma não informa
+
+    Usa o psutil se estiver instalado; sem ele, lê /sys e getloadavg (Linux).
+    """
+
+    def __init__(self):
+        try:
+            import psutil
+        except ImportError:
+            psutil = None
+        self.psutil = psutil
+        if psutil is not None:
+            # A primeira leitura de cpu_percent(None) sempre devolve 0
+            psutil.cpu_percent(None)
+
+    def temperatura(self):
+        """Maior temperatura de CPU em °C"""
+        if self.psutil is not None and hasattr(self.psutil, "sensors_temperatures"):
+            leituras = [s.current for lista in self.psutil.sensors_temperatures().values()
+                        for s in lista if s.current]
+            if leituras:
+                return max(leituras)
+
+        leituras = []
+        for caminho in glob.glob("/sys/class/thermal/thermal_zone*/temp"):
+            try:
+                with open(caminho) as f:
+                    leituras.append(int(f.read()) / 1000.0)
+            except (OSError, ValueError):
+                continue
+        return max(leituras) if leituras else None
+
+    def carga(self):
+        """Uso da CPU de 0 a 1"""
+        if self.psutil is not None:
+            return self.psutil.cpu_percent(None) / 100.0
+        if hasattr(os, "getloadavg"):
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        return None
+
+    def bateria(self):
+        """(percentual, na tomada) ou None sem bateria"""
+        if self.psutil is None or not hasattr(self.psutil, "sensors_battery"):
+            return None
+        bateria = self.psutil.sensors_battery()
+        if bateria is None:
+            return None
+        return bateria.percent, bateria.power_plugged
+
+
+class ControladorQualidade:
+    """Move o assistente entre pontos de operação para caber em `orcamento_ms`
+
+    A cada `periodo` segundos compara o p90 das últimas inferências com o
+    orçamento e lê temperatura, carga e bateria. Estourar o orçamento (ou
+    esquentar, saturar a CPU, bateria baixa fora da tomada) desce um ponto;
+    só sobe com folga real (p90 abaixo de `folga` × orçamento e sensores
+    normais). A histerese vem da faixa morta entre os dois limiares, de exigir
+    `confirmacoes` avaliações seguidas e de `permanencia` segundos mínimos
+    antes de subir. `aplicar(ponto)` efetiva a mudança; toda transição é
+    registrada no log e nas métricas. Um ponto que não pôde ser efetivado
+    (ex.: pesos do modelo ausentes) sai da escala com `descartar`.
+    """
+
+    def __init__(self, pontos=PONTOS, inicial=1, orcamento_ms=200.0, folga=0.6,
+                 temp_max=80.0, carga_max=0.9, bateria_min=20.0, periodo=2.0,
+                 permanencia=10.0, confirmacoes=2, amostras_min=5, aplicar=None, sensores=None):
+        self.pontos = list(pontos)
+        self.indice = min(max(inicial, 0), len(self.pontos) - 1)
+        self.orcamento = orcamento_ms / 1000.0
+        self.folga = folga
+        self.temp_max = temp_max
+        self.carga_max = carga_max
+        self.bateria_min = bateria_min
+        self.periodo = periodo
+        self.permanencia = permanencia
+        self.confirmacoes = confirmacoes
+        self.amostras_min = amostras_min
+        self.aplicar = aplicar
+        self.sensores = sensores or Sensores()
+
+        self._latencias = deque(maxlen=30)
+        self._pressao = 0
+        self._alivio = 0
+        self._desde = time.monotonic()
+        self._parado = threading.Event()
+        self._thread = None
+        # Reentrante: `aplicar` pode descartar o ponto ainda dentro de avaliar
+        self._lock = threading.RLock()
+        self.indisponiveis = set()
+        self.transicoes = []
+        METRICAS.definir("ponto_qualidade", self.indice)
+
+    @property
+    def ponto(self):
+        return self.pontos[self.indice]
+
+    def observar(self, segundos):
+        """Duração de uma inferência (chamado pelo laço de detecção)"""
+        self._latencias.append(segundos)
+
+    def _motivos(self):
+        """(motivos para descer, motivos que impedem subir, p90)"""
+        descer, segurar = [], []
+        p90 = None
+        if len(self._latencias) >= self.amostras_min:
+            p90 = float(np.percentile(np.fromiter(self._latencias, float), 90))
+            if p90 > self.orcamento:
+                descer.append(f"latencia p90 {p90 * 1000:.0f} ms > {self.orcamento * 1000:.0f} ms")
+            elif p90 > self.orcamento * self.folga:
+                segurar.append("latencia sem folga")
+        else:
+            segurar.append("poucas amostras")
+
+        temperatura = self.sensores.temperatura()
+        if temperatura is not None:
+            METRICAS.definir("temperatura_cpu", round(temperatura, 1))
+            if temperatura > self.temp_max:
+                descer.append(f"temperatura {temperatura:.0f} C")
+            elif temperatura > self.temp_max - 5:
+                segurar.append("temperatura alta")
+
+        carga = self.sensores.carga()
+        if carga is not None:
+            METRICAS.definir("carga_cpu", round(carga, 2))
+            if carga > self.carga_max:
+                descer.append(f"carga {carga:.0%}")
+            elif carga > self.carga_max * 0.8:
+                segurar.append("carga alta")
+
+        bateria = self.sensores.bateria()
+        if bateria is not None:
+            percentual, na_tomada = bateria
+            METRICAS.definir("bateria", percentual)
+            if not na_tomada and percentual < self.bateria_min:
+                descer.append(f"bateria {percentual:.0f}%")
+                segurar.append("bateria baixa")
+
+        return descer, segurar, p90
+
+    def _vizinho(self, passo):
+        """Próximo ponto disponível na direção `passo` (+1 desce, -1 sobe) ou None"""
+        indice = self.indice + passo
+        while 0 <= indice < len(self.pontos):
+            if indice not in self.indisponiveis:
+                return indice
+            indice += passo
+        return None
+
+    def avaliar(self):
+        """Uma rodada de decisão; retorna o novo índice ou None se ficou"""
+        with self._lock:
+            return self._avaliar()
+
+    def _avaliar(self):
+        descer, segurar, p90 = self._motivos()
+        agora = time.monotonic()
+
+        if descer:
+            self._pressao += 1
+            self._alivio = 0
+        elif not segurar:
+            self._alivio += 1
+            self._pressao = 0
+        else:
+            self._pressao = self._alivio = 0
+
+        abaixo, acima = self._vizinho(1), self._vizinho(-1)
+        if self._pressao >= self.confirmacoes and abaixo is not None:
+            return self._mudar(abaixo, ", ".join(descer))
+        if (self._alivio >= self.confirmacoes and acima is not None
+                and agora - self._desde >= self.permanencia):
+            return self._mudar(acima, f"folga (p90 {p90 * 1000:.0f} ms)")
+        return None
+
+    def descartar(self, indices, volta, motivo):
+        """Tira `indices` da escala; se o ponto atual é um deles, volta para `volta`
+
+        Chamado por quem aplica os pontos quando um deles falha (ex.: modelo
+        que não carrega offline): o controle não fica num ponto que não está
+        rodando, medindo a latência de outro modelo.
+        """
+        with self._lock:
+            self.indisponiveis.update(indices)
+            print(f"Qualidade: pontos {sorted(indices)} indisponiveis: {motivo}")
+            METRICAS.definir("pontos_indisponiveis", len(self.indisponiveis))
+            if self.indice not in self.indisponiveis:
+                return
+            if volta in self.indisponiveis:
+                volta = self._vizinho(1)
+                volta = self._vizinho(-1) if volta is None else volta
+            if volta is not None:
+                self._mudar(volta, f"falha ao aplicar ({motivo})")
+
+    def _mudar(self, indice, motivo):
+        anterior, self.indice = self.indice, indice
+        self._pressao = self._alivio = 0
+        self._desde = time.monotonic()
+        # Amostras do ponto anterior não dizem nada sobre o novo
+        self._latencias.clear()
+
+        ponto = self.ponto
+        print(f"Qualidade: ponto {anterior} -> {indice} ({ponto['modelo']}, imgsz {ponto['imgsz']}, "
+              f"intervalo {ponto['intervalo']} s): {motivo}")
+        self.transicoes.append((time.time(), anterior, indice, motivo))
+        METRICAS.incrementar("transicoes_qualidade")
+        METRICAS.definir("ponto_qualidade", indice)
+        if self.aplicar is not None:
+            self.aplicar(ponto)
+        return indice
+
+    def _executar(self):
+        while not self._parado.wait(self.periodo):
+            try:
+                self.avaliar()
+            except Exception as e:
+                print(f"Erro no controle de qualidade: {e}")
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parado.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+def ponto_inicial(pontos, modelo, imgsz):
+    """Índice do ponto igual à configuração atual (ou o mais próximo em imgsz)"""
+    mesmos = [i for i, p in enumerate(pontos) if p["modelo"] == modelo]
+    if not mesmos:
+        return 0
+    return min(mesmos, key=lambda i: (abs(pontos[i]["imgsz"] - imgsz), pontos[i]["intervalo"]))
+
+
+def adicionar_argumentos(parser):
+    parser.add_argument("--qualidade-auto", action="store_true",
+                        help="ajusta modelo, resolucao e intervalo para caber no orcamento de latencia")
@@ -0,0 +1,316 @@
+"""
+Rastreamento leve de objetos entre frames (IoU + velocidade constante)
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from pos_processamento import LoteDeteccoes, MUITO_PROXIMO, PROXIMO
+from tts import NORMAL, URGENTE, prioridade_distancia
+
+# Tipos de evento, do mais para o menos importante
+APROXIMANDO, NOVO, MUDOU_ZONA = "aproximando", "novo", "mudou_zona"
+ORDEM_EVENTOS = {APROXIMANDO: 0, NOVO: 1, MUDOU_ZONA: 2}
+
+# indice: linha no lote que gerou o evento; id: identificador da trilha
+Evento = namedtuple('Evento', 'tipo indice id')
+
+
+def matriz_iou(a, b):
+    """IoU entre todas as caixas (M, 4) x (N, 4)"""
+    a = a.astype(np.float32)[:, None, :]
+    b = b.astype(np.float32)[None, :, :]
+
+    largura = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    altura = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersecao = largura * altura
+
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersecao / np.maximum(area_a + area_b - intersecao, 1e-6)
+
+
+def associar(custo_iou, iou_min):
+    """Associação gulosa pelos maiores IoU; retorna pares (trilha, detecção)"""
+    if custo_iou.size == 0:
+        return []
+
+    linhas, colunas = np.nonzero(custo_iou >= iou_min)
+    ordem = np.argsort(-custo_iou[linhas, colunas], kind='stable')
+
+    pares = []
+    usadas_t, usadas_d = set(), set()
+    for t, d in zip(linhas[ordem].tolist(), colunas[ordem].tolist()):
+        if t in usadas_t or d in usadas_d:
+            continue
+        usadas_t.add(t)
+        usadas_d.add(d)
+        pares.append((t, d))
+    return pares
+
+
+class Rastreador:
+    """Mantém IDs por objeto e gera eventos em vez de anúncios por frame
+
+    Eventos: NOVO quando uma trilha é confirmada, APROXIMANDO quando a área
+    cresce mais rápido que `limiar_aproximacao` (fração por segundo) ou o tempo
+    até o contato cai abaixo de `ttc_alerta` segundos, e MUDOU_ZONA quando o
+    objeto passa para outro terço da imagem.
+
+    O tempo até o contato vem da variação da distância métrica da trilha
+    quando o lote traz `metros`; sem ela, da expansão da caixa (a área cresce
+    com 1/d², então TTC ≈ 2 / crescimento relativo da área).
+
+    Filtro temporal por trilha: confiança e área passam por média móvel
+    exponencial (`alfa`); a trilha fica visível quando a confiança média passa
+    de `conf_entrada` e só some abaixo de `conf_saida`. A faixa de distância
+    só muda quando `votos` das últimas `janela` observações (anel fixo por
+    trilha) concordam, exceto "muito proximo", aceito na hora. O lote recebe a
+    faixa estável e a área suavizada; `visiveis` marca suas linhas visíveis.
+    """
+
+    def __init__(self, iou_min=0.3, max_perdido=1.0, confirmacao=2,
+                 limiar_aproximacao=0.4, intervalo_aproximacao=3.0, horizonte_previsao=0.5,
+                 ttc_alerta=2.0, conf_entrada=0.0, conf_saida=0.0, alfa=0.5,
+                 janela=5, votos=4):
+        self.iou_min = iou_min
+        self.max_perdido = max_perdido
+        self.confirmacao = confirmacao
+        self.limiar_aproximacao = limiar_aproximacao
+        self.ttc_alerta = ttc_alerta
+        self.intervalo_aproximacao = intervalo_aproximacao
+        self.horizonte_previsao = horizonte_previsao
+        self.conf_entrada = conf_entrada
+        self.conf_saida = min(conf_saida, conf_entrada)
+        self.alfa = alfa
+        self.janela = janela
+        self.votos = min(votos, janela)
+
+        # Estado das trilhas em colunas (uma linha por trilha)
+        self.ids = np.zeros(0, np.int64)
+        self.bbox = np.zeros((0, 4), np.float32)
+        self.velocidade = np.zeros((0, 4), np.float32)  # px/s
+        self.classe = np.zeros(0, np.int32)
+        self.posicao = np.zeros(0, np.int8)
+        self.crescimento = np.zeros(0, np.float32)  # variação relativa da área por segundo
+        self.metros = np.zeros(0, np.float32)       # distância suavizada (NaN se desconhecida)
+        self.aproximacao = np.zeros(0, np.float32)  # m/s em direção à câmera
+        self.ttc = np.zeros(0, np.float32)          # segundos até o contato
+        self.acertos = np.zeros(0, np.int32)
+        self.visto = np.zeros(0, np.float64)
+        self.aviso_aproximacao = np.zeros(0, np.float64)
+        self.indice_lote = np.zeros(0, np.int32)
+        # Filtro temporal
+        self.conf_ema = np.zeros(0, np.float32)
+        self.area_ema = np.zeros(0, np.float32)
+        self.hist_distancia = np.zeros((0, janela), np.int8)  # anel por trilha (-1 = vazio)
+        self.distancia = np.zeros(0, np.int8)                  # faixa estável
+        self.visivel = np.zeros(0, bool)
+        self.anunciada = np.zeros(0, bool)
+
+        self._proximo_id = 1
+        self.lote = None
+        self.visiveis = np.zeros(0, bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _previstas(self, t):
+        dt = np.clip(t - self.visto, 0, self.horizonte_previsao)[:, None]
+        return self.bbox + self.velocidade * dt
+
+    def atualizar(self, lote, t, reaproveitado=False):
+        """Associa o lote às trilhas existentes e retorna os eventos gerados
+
+        O lote recebido não é alterado: faixa estável, área suavizada e TTC vão
+        para uma cópia, disponível em `self.lote` (os índices dos eventos são
+        os mesmos). `reaproveitado` marca o lote que o pipeline reenvia em cena
+        parada: ele só mantém as trilhas vivas, sem contar como observação.
+        """
+        eventos = []
+        n = len(lote)
+        lote = lote.selecionar(np.arange(n))
+
+        iou = matriz_iou(self._previstas(t), lote.bbox) if len(self.ids) and n else np.zeros((0, 0))
+        if iou.size:
+            # Só associa objetos da mesma classe
+            iou[self.classe[:, None] != lote.classe[None, :]] = 0
+        pares = associar(iou, self.iou_min)
+
+        self.indice_lote[:] = -1
+        if reaproveitado:
+            self._manter(lote, t, pares)
+            return self._publicar(lote, eventos, t)
+        novas = np.ones(n, dtype=bool)
+
+        if pares:
+            trilhas = np.array([p[0] for p in pares])
+            dets = np.array([p[1] for p in pares])
+            novas[dets] = False
+
+            dt = np.maximum(t - self.visto[trilhas], 1e-3)[:, None]
+            caixas = lote.bbox[dets].astype(np.float32)
+            anteriores = self.bbox[trilhas]
+
+            self.velocidade[trilhas] = 0.5 * self.velocidade[trilhas] + 0.5 * (caixas - anteriores) / dt
+
+            area_ant = np.maximum((anteriores[:, 2] - anteriores[:, 0]) * (anteriores[:, 3] - anteriores[:, 1]), 1.0)
+            area = (caixas[:, 2] - caixas[:, 0]) * (caixas[:, 3] - caixas[:, 1])
+            taxa = (area / area_ant - 1.0) / dt[:, 0]
+            self.crescimento[trilhas] = 0.6 * self.crescimento[trilhas] + 0.4 * taxa
+
+            # Tempo até o contato: pela distância métrica se houver, senão pela expansão
+            metros = lote.metros[dets]
+            anteriores_m = self.metros[trilhas]
+            com_metros = np.isfinite(metros) & np.isfinite(anteriores_m)
+            suave = np.where(com_metros, 0.5 * anteriores_m + 0.5 * metros, metros)
+            velocidade_m = np.where(com_metros, (anteriores_m - suave) / dt[:, 0], 0.0)
+            self.aproximacao[trilhas] = 0.5 * self.aproximacao[trilhas] + 0.5 * velocidade_m
+            self.metros[trilhas] = suave
+
+            crescimento = self.crescimento[trilhas]
+            aproximacao = self.aproximacao[trilhas]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ttc = np.where(com_metros,
+                               np.where(aproximacao > 0.1, suave / aproximacao, np.inf),
+                               np.where(crescimento > 0.05, 2.0 / crescimento, np.inf))
+            self.ttc[trilhas] = ttc
+            lote.ttc[dets] = ttc
+
+            # Filtro temporal: médias móveis e votação da faixa no anel da trilha
+            a = self.alfa
+            self.conf_ema[trilhas] = a * lote.confianca[dets] + (1 - a) * self.conf_ema[trilhas]
+            self.area_ema[trilhas] = a * lote.area_ratio[dets] + (1 - a) * self.area_ema[trilhas]
+            candidata = lote.distancia[dets]
+            self.hist_distancia[trilhas, self.acertos[trilhas] % self.janela] = candidata
+            votos = (self.hist_distancia[trilhas] == candidata[:, None]).sum(1)
+            # Muito próximo é perigo: não espera a votação
+            aceita = (votos >= self.votos) | (candidata == MUITO_PROXIMO)
+            self.distancia[trilhas] = np.where(aceita, candidata, self.distancia[trilhas])
+            lote.distancia[dets] = self.distancia[trilhas]
+            lote.area_ratio[dets] = self.area_ema[trilhas]
+
+            conf = self.conf_ema[trilhas]
+            self.visivel[trilhas] = np.where(self.visivel[trilhas], conf >= self.conf_saida,
+                                             conf >= self.conf_entrada)
+
+            mudou_zona = self.posicao[trilhas] != lote.posicao[dets]
+
+            self.bbox[trilhas] = caixas
+            self.posicao[trilhas] = lote.posicao[dets]
+            self.acertos[trilhas] += 1
+            self.visto[trilhas] = t
+            self.indice_lote[trilhas] = dets
+
+            visiveis = self.visivel[trilhas]
+            confirmadas = (self.acertos[trilhas] > self.confirmacao) & visiveis
+            aproximando = (confirmadas
+                           & ((self.crescimento[trilhas] > self.limiar_aproximacao)
+                              | (self.ttc[trilhas] < self.ttc_alerta))
+                           & (t - self.aviso_aproximacao[trilhas] > self.intervalo_aproximacao))
+            self.aviso_aproximacao[trilhas[aproximando]] = t
+
+            # NOVO uma vez por trilha, quando confirmada e visível
+            novos = (self.acertos[trilhas] >= self.confirmacao) & visiveis & ~self.anunciada[trilhas]
+            self.anunciada[trilhas[novos]] = True
+            for k in np.nonzero(novos)[0].tolist():
+                eventos.append(Evento(NOVO, int(dets[k]), int(self.ids[trilhas[k]])))
+            for k in np.nonzero(aproximando)[0].tolist():
+                eventos.append(Evento(APROXIMANDO, int(dets[k]), int(self.ids[trilhas[k]])))
+            for k in np.nonzero(confirmadas & mudou_zona & ~aproximando)[0].tolist():
+                eventos.append(Evento(MUDOU_ZONA, int(dets[k]), int(self.ids[trilhas[k]])))
+
+        # Detecções sem trilha abrem trilhas novas
+        if novas.any():
+            idx = np.nonzero(novas)[0]
+            k = len(idx)
+            ids = np.arange(self._proximo_id, self._proximo_id + k)
+            self._proximo_id += k
+
+            self.ids = np.concatenate([self.ids, ids])
+            self.bbox = np.concatenate([self.bbox, lote.bbox[idx].astype(np.float32)])
+            self.velocidade = np.concatenate([self.velocidade, np.zeros((k, 4), np.float32)])
+            self.classe = np.concatenate([self.classe, lote.classe[idx]])
+            self.posicao = np.concatenate([self.posicao, lote.posicao[idx]])
+            self.crescimento = np.concatenate([self.crescimento, np.zeros(k, np.float32)])
+            self.metros = np.concatenate([self.metros, lote.metros[idx]])
+            self.aproximacao = np.concatenate([self.aproximacao, np.zeros(k, np.float32)])
+            self.ttc = np.concatenate([self.ttc, np.full(k, np.inf, np.float32)])
+            self.acertos = np.concatenate([self.acertos, np.ones(k, np.int32)])
+            self.visto = np.concatenate([self.visto, np.full(k, t)])
+            self.aviso_aproximacao = np.concatenate([self.aviso_aproximacao, np.full(k, -np.inf)])
+            self.indice_lote = np.concatenate([self.indice_lote, idx.astype(np.int32)])
+
+            historico = np.full((k, self.janela), -1, np.int8)
+            historico[:, 0] = lote.distancia[idx]
+            visivel = lote.confianca[idx] >= self.conf_entrada
+            anunciar = visivel & (self.confirmacao <= 1)
+            self.conf_ema = np.concatenate([self.conf_ema, lote.confianca[idx].astype(np.float32)])
+            self.area_ema = np.concatenate([self.area_ema, lote.area_ratio[idx].astype(np.float32)])
+            self.hist_distancia = np.concatenate([self.hist_distancia, historico])
+            self.distancia = np.concatenate([self.distancia, lote.distancia[idx]])
+            self.visivel = np.concatenate([self.visivel, visivel])
+            self.anunciada = np.concatenate([self.anunciada, anunciar])
+
+            eventos.extend(Evento(NOVO, int(d), int(i))
+                           for d, i in zip(idx[anunciar].tolist(), ids[anunciar].tolist()))
+
+        return self._publicar(lote, eventos, t)
+
+    def _manter(self, lote, t, pares):
+        """Lote reaproveitado: renova as trilhas associadas sem votar, contar
+        acertos nem mexer nas médias (uma detecção reenviada não confirma nada)"""
+        if not pares:
+            return
+        trilhas = np.array([p[0] for p in pares])
+        dets = np.array([p[1] for p in pares])
+        # A previsão segue de onde está agora; a velocidade fica para a próxima inferência
+        self.bbox[trilhas] = self._previstas(t)[trilhas]
+        self.visto[trilhas] = t
+        self.indice_lote[trilhas] = dets
+        lote.distancia[dets] = self.distancia[trilhas]
+        lote.area_ratio[dets] = self.area_ema[trilhas]
+        lote.ttc[dets] = self.ttc[trilhas]
+
+    def _publicar(self, lote, eventos, t):
+        """Remove trilhas perdidas, guarda o lote filtrado e ordena os eventos"""
+        n = len(lote)
+        # Remove trilhas perdidas há muito tempo
+        manter = t - self.visto <= self.max_perdido
+        if not manter.all():
+            for nome in ('ids', 'bbox', 'velocidade', 'classe', 'posicao', 'crescimento',
+                         'metros', 'aproximacao', 'ttc',
+                         'acertos', 'visto', 'aviso_aproximacao', 'indice_lote',
+                         'conf_ema', 'area_ema', 'hist_distancia', 'distancia', 'visivel',
+                         'anunciada'):
+                setattr(self, nome, getattr(self, nome)[manter])
+
+        self.lote = lote
+        self.visiveis = np.zeros(n, bool)
+        vistas = self.indice_lote >= 0
+        self.visiveis[self.indice_lote[vistas & self.visivel]] = True
+        eventos.sort(key=lambda e: (ORDEM_EVENTOS[e.tipo], -lote.area_ratio[e.indice]))
+        return eventos
+
+    def prever(self, t):
+        """Último lote (só as linhas visíveis) com as caixas propagadas até o instante t"""
+        if self.lote is None:
+            return None
+
+        vistas = self.indice_lote >= 0
+        bbox = self.lote.bbox.copy()
+        bbox[self.indice_lote[vistas]] = self._previstas(t)[vistas].astype(np.int32)
+
+        lote = self.lote
+        previsto = LoteDeteccoes(bbox, lote.confianca, lote.classe, lote.area_ratio,
+                                 lote.posicao, lote.distancia, lote.nomes, lote.metros, lote.ttc)
+        # Só o que passou pelo filtro temporal aparece na tela
+        return previsto.selecionar(self.visiveis)
+
+
+def prioridade_evento(evento, lote):
+    """Aproximação de objeto próximo é sempre urgente; os demais seguem a distância"""
+    distancia = lote.distancia[evento.indice]
+    if evento.tipo == APROXIMANDO:
+        return URGENTE if distancia <= PROXIMO else NORMAL
+    return prioridade_distancia(distancia)
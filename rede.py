@@ -0,0 +1,435 @@
+"""
+Modo em rede: cliente leve (câmera + voz) e servidor de inferência compartilhado, sobre asyncio TCP
+"""
+import argparse
+import asyncio
+import json
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import metricas
+from gravacao import DTYPE_DETECCAO, registros_deteccao
+from metricas import METRICAS
+from tts import URGENTE
+
+PORTA_PADRAO = 8765
+
+# Mensagem: tamanho do corpo (4 bytes) + tipo (1 byte) + corpo
+CABECALHO = struct.Struct("!IB")
+OLA, FRAME, DETECCOES, ANUNCIO = b"HFDA"
+# Início dos corpos FRAME e DETECCOES: número do frame + instante da captura no cliente
+QUADRO = struct.Struct("!Id")
+TAMANHO_MAX = 16 * 1024 * 1024
+# Primeira espera (s) antes de reconectar; dobra até backoff_max
+BACKOFF_INICIAL = 0.5
+
+
+async def ler_mensagem(reader):
+    """(tipo, corpo) da próxima mensagem; IncompleteReadError se a conexão cair"""
+    tamanho, tipo = CABECALHO.unpack(await reader.readexactly(CABECALHO.size))
+    if tamanho > TAMANHO_MAX:
+        raise ConnectionError(f"Mensagem grande demais: {tamanho} bytes")
+    return tipo, await reader.readexactly(tamanho)
+
+
+def escrever_mensagem(writer, tipo, corpo):
+    writer.write(CABECALHO.pack(len(corpo), tipo) + corpo)
+
+
+class SessaoCliente:
+    """Estado de um cliente no servidor: frame pendente, anunciador e conexão
+
+    Só o frame mais recente fica pendente; os anteriores são descartados.
+    Resultados de detecção não são enviados enquanto o buffer de saída do
+    cliente passar de `buffer_max` bytes; anúncios sempre são.
+    """
+
+    def __init__(self, nome, writer, buffer_max=256 * 1024):
+        self.nome = nome
+        self.writer = writer
+        self.buffer_max = buffer_max
+        self.pendente = None
+        self.anunciador = None
+        self.fechada = False
+        self.frames = 0
+        self.descartados = 0
+
+    def receber_frame(self, corpo):
+        seq, t = QUADRO.unpack_from(corpo)
+        if self.pendente is not None:
+            self.descartados += 1
+            METRICAS.incrementar("frames_descartados_rede")
+        self.pendente = (seq, t, corpo[QUADRO.size:])
+        self.frames += 1
+
+    def falar(self, texto, prioridade):
+        if not self.fechada:
+            escrever_mensagem(self.writer, ANUNCIO, bytes([prioridade]) + texto.encode("utf-8"))
+
+    def enviar_deteccoes(self, seq, t, detections):
+        if self.fechada:
+            return
+        if self.writer.transport.get_write_buffer_size() > self.buffer_max:
+            METRICAS.incrementar("resultados_descartados_rede")
+            return
+        escrever_mensagem(self.writer, DETECCOES,
+                          QUADRO.pack(seq, t) + registros_deteccao(detections, seq).tobytes())
+
+
+class ServidorRede:
+    """Um modelo para vários clientes, com lote entre clientes e contrapressão por cliente
+
+    Cada cliente tem seu próprio anunciador (rastreador, intervalo, resumo);
+    as falas voltam ao cliente, que as reproduz localmente.
+    """
+
+    def __init__(self, assistente, host="0.0.0.0", porta=PORTA_PADRAO, max_lote=4):
+        self.assistente = assistente
+        self.host = host
+        self.porta = porta
+        self.max_lote = max_lote
+        self.clientes = []
+        self._rodizio = 0
+        # Uma thread só: o modelo é um só
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._novo = None
+
+    async def _atender(self, reader, writer):
+        from motor import Anunciador
+
+        endereco = writer.get_extra_info("peername")
+        try:
+            tipo, corpo = await ler_mensagem(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        ola = json.loads(corpo) if tipo == OLA else {}
+        nome = ola.get("nome") or f"{endereco[0]}:{endereco[1]}"
+
+        sessao = SessaoCliente(nome, writer)
+        sessao.anunciador = Anunciador(self.assistente.perfil, self.assistente.frases,
+                                       sessao.falar)
+        escrever_mensagem(writer, OLA, json.dumps({
+            "perfil": self.assistente.perfil["nome"],
+            "classes": {i: n for i, n in enumerate(self.assistente.pos.nomes) if n},
+            # Partes dos anúncios: o cliente aquece o próprio cache de voz com elas
+            "separador": self.assistente.frases.separador,
+            "vocabulario": self.assistente.frases.vocabulario(),
+        }, ensure_ascii=False).encode("utf-8"))
+
+        self.clientes.append(sessao)
+        METRICAS.definir("clientes_rede", len(self.clientes))
+        print(f"Cliente {nome} conectado")
+        try:
+            while True:
+                tipo, corpo = await ler_mensagem(reader)
+                if tipo == FRAME:
+                    sessao.receber_frame(corpo)
+                    self._novo.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            sessao.fechada = True
+            self.clientes.remove(sessao)
+            METRICAS.definir("clientes_rede", len(self.clientes))
+            writer.close()
+            print(f"Cliente {nome} desconectado ({sessao.frames} frames, "
+                  f"{sessao.descartados} descartados)")
+
+    def _detectar(self, jpegs):
+        """Decodifica e detecta em lote (thread do executor); None onde o JPEG falhou"""
+        frames = [cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_COLOR) for j in jpegs]
+        validos = [f for f in frames if f is not None]
+        resultados = iter(self.assistente.detect_batch(validos) if validos else [])
+        return [next(resultados) if f is not None else None for f in frames]
+
+    def _coletar(self):
+        """Frames pendentes de até max_lote clientes, em rodízio"""
+        prontos = [c for c in self.clientes if c.pendente is not None]
+        if not prontos:
+            return []
+        k = self._rodizio % len(prontos)
+        self._rodizio += 1
+        lote = []
+        for sessao in (prontos[k:] + prontos[:k])[:self.max_lote]:
+            lote.append((sessao, sessao.pendente))
+            sessao.pendente = None
+        return lote
+
+    async def _inferir(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._novo.wait()
+            self._novo.clear()
+            lote = self._coletar()
+            if not lote:
+                continue
+            if any(c.pendente is not None for c in self.clientes):
+                self._novo.set()
+
+            try:
+                with METRICAS.cronometrar("inferencia_rede"):
+                    resultados = await loop.run_in_executor(
+                        self._executor, self._detectar, [p[2] for _, p in lote])
+            except Exception as e:
+                print(f"Erro na inferência: {e}")
+                METRICAS.incrementar("erros_inferencia")
+                continue
+            METRICAS.definir("tamanho_lote", len(lote))
+
+            agora = time.time()
+            for (sessao, (seq, t, _)), detections in zip(lote, resultados):
+                if detections is None or sessao.fechada:
+                    continue
+                sessao.anunciador.anunciar(detections, agora)
+                sessao.enviar_deteccoes(seq, t, detections)
+
+    async def executar(self):
+        self._novo = asyncio.Event()
+        servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        print(f"Servidor de inferencia em {self.host}:{self.porta}")
+        tarefa = asyncio.create_task(self._inferir())
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            tarefa.cancel()
+            self._executor.shutdown(wait=False)
+
+
+class ClienteCamera:
+    """Captura, comprime em JPEG e envia frames; fala localmente o que o servidor anunciar
+
+    No máximo `em_voo_max` frames aguardam resposta; frames além disso são
+    descartados já no cliente. A qualidade do JPEG (e, no limite, a escala do
+    frame) cai quando a ida e volta passa de `latencia_alvo` e sobe com folga.
+    Se a conexão cair, reconecta com espera exponencial. O vocabulário de
+    anúncios do servidor chega no OLA e aquece o cache de voz local.
+    """
+
+    def __init__(self, host, porta=PORTA_PADRAO, cap=None, fala=None, nome=None,
+                 qualidade=80, qualidade_min=35, qualidade_max=90, escala_min=0.4,
+                 latencia_alvo=0.3, em_voo_max=2, backoff_max=8.0):
+        self.host = host
+        self.porta = porta
+        self.cap = cap
+        self.fala = fala
+        self.nome = nome
+        self.qualidade = qualidade
+        self.qualidade_min = qualidade_min
+        self.qualidade_max = qualidade_max
+        self.escala = 1.0
+        self.escala_min = escala_min
+        self.latencia_alvo = latencia_alvo
+        self.em_voo_max = em_voo_max
+        self.backoff_max = backoff_max
+
+        self.em_voo = {}
+        self.latencia = None
+        self.ultimas = np.zeros(0, DTYPE_DETECCAO)
+        self.classes = {}
+        self._seq = 0
+        # Estado da reconexão: zerado a cada sessão estabelecida (OLA do servidor)
+        self._espera = BACKOFF_INICIAL
+        self._desconectado = False
+        self._ultimo_ajuste = 0.0
+        self.enviados = 0
+        self.descartados = 0
+
+    def _codificar(self, frame):
+        if self.escala < 1.0:
+            frame = cv2.resize(frame, None, fx=self.escala, fy=self.escala,
+                               interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.qualidade)])
+        return jpeg.tobytes() if ok else None
+
+    def _ajustar(self, ida_volta):
+        """Qualidade adaptativa com no máximo um ajuste por segundo"""
+        self.latencia = ida_volta if self.latencia is None else 0.8 * self.latencia + 0.2 * ida_volta
+        agora = time.monotonic()
+        if agora - self._ultimo_ajuste < 1.0:
+            return
+        if self.latencia > self.latencia_alvo:
+            if self.qualidade > self.qualidade_min:
+                self.qualidade = max(self.qualidade_min, self.qualidade - 10)
+            else:
+                self.escala = max(self.escala_min, self.escala * 0.8)
+        elif self.latencia < self.latencia_alvo * 0.5:
+            if self.escala < 1.0:
+                self.escala = min(1.0, self.escala / 0.8)
+            else:
+                self.qualidade = min(self.qualidade_max, self.qualidade + 5)
+        else:
+            return
+        self._ultimo_ajuste = agora
+        METRICAS.definir("qualidade_jpeg", self.qualidade)
+        METRICAS.definir("escala_envio", round(self.escala, 2))
+
+    def _liberar(self, seq):
+        """Resposta do frame seq: os anteriores sem resposta foram substituídos no servidor"""
+        for antigo in [s for s in self.em_voo if s <= seq]:
+            del self.em_voo[antigo]
+
+    async def _enviar(self, writer):
+        # run_in_executor em vez de asyncio.to_thread (3.9+): roda no Python 3.8
+        loop = asyncio.get_running_loop()
+        while True:
+            ret, frame = await loop.run_in_executor(None, self.cap.read, 0.5)
+            if not ret:
+                if getattr(self.cap, "encerrada", False):
+                    return
+                continue
+
+            # Respostas que nunca vieram não seguram o envio para sempre
+            limite = time.time() - 2.0
+            for seq in [s for s, t in self.em_voo.items() if t < limite]:
+                del self.em_voo[seq]
+            if len(self.em_voo) >= self.em_voo_max:
+                self.descartados += 1
+                METRICAS.incrementar("frames_descartados")
+                continue
+
+            jpeg = await loop.run_in_executor(None, self._codificar, frame)
+            if jpeg is None:
+                continue
+            self._seq += 1
+            t = time.time()
+            self.em_voo[self._seq] = t
+            escrever_mensagem(writer, FRAME, QUADRO.pack(self._seq, t) + jpeg)
+            await writer.drain()
+            self.enviados += 1
+
+    async def _receber(self, reader):
+        while True:
+            tipo, corpo = await ler_mensagem(reader)
+            if tipo == ANUNCIO:
+                self.fala.falar(corpo[1:].decode("utf-8"), corpo[0])
+            elif tipo == DETECCOES:
+                seq, t = QUADRO.unpack_from(corpo)
+                self._liberar(seq)
+                self._ajustar(time.time() - t)
+                METRICAS.observar("ida_volta_rede", time.time() - t)
+                self.ultimas = np.frombuffer(corpo, DTYPE_DETECCAO, offset=QUADRO.size)
+            elif tipo == OLA:
+                dados = json.loads(corpo)
+                self.classes = {int(i): n for i, n in dados.get("classes", {}).items()}
+                print(f"Conectado ao servidor ({dados.get('perfil')})")
+                if dados.get("vocabulario"):
+                    # Resumos do servidor tocam parte por parte do cache local
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, self.fala.aquecer, dados["vocabulario"], dados.get("separador"))
+                self._espera = BACKOFF_INICIAL
+                if self._desconectado:
+                    self._desconectado = False
+                    self.fala.falar("Servidor reconectado", URGENTE)
+
+    async def _sessao(self):
+        reader, writer = await asyncio.open_connection(self.host, self.porta)
+        try:
+            escrever_mensagem(writer, OLA, json.dumps({"nome": self.nome}).encode("utf-8"))
+            await writer.drain()
+            self.em_voo.clear()
+
+            enviar = asyncio.create_task(self._enviar(writer))
+            receber = asyncio.create_task(self._receber(reader))
+            feitas, pendentes = await asyncio.wait({enviar, receber},
+                                                   return_when=asyncio.FIRST_COMPLETED)
+            for tarefa in pendentes:
+                tarefa.cancel()
+            for tarefa in feitas:
+                # Repassa erros de conexão para o laço de reconexão
+                tarefa.result()
+        finally:
+            writer.close()
+
+    async def executar(self):
+        while not getattr(self.cap, "encerrada", False):
+            try:
+                await self._sessao()
+                if getattr(self.cap, "encerrada", False):
+                    break
+            except (OSError, asyncio.IncompleteReadError, ConnectionError) as e:
+                # Um aviso por queda; o OLA da próxima sessão rearma
+                if not self._desconectado:
+                    print(f"Servidor {self.host}:{self.porta} indisponivel: {e}")
+                    # Sem servidor o usuário fica sem alertas
+                    self.fala.falar("Servidor desconectado", URGENTE)
+                    self._desconectado = True
+                await asyncio.sleep(self._espera)
+                self._espera = min(self._espera * 2, self.backoff_max)
+        print(f"Cliente encerrado: {self.enviados} frames enviados, "
+              f"{self.descartados} descartados")
+
+
+def _servidor(args):
+    from benchmark import FalaNula
+    from motor import Assistente
+
+    metricas.configurar(args)
+    # O servidor não fala: as falas vão para os clientes
+    assistente = Assistente(args.backend, args.modelo, args.threads, fala=FalaNula(),
+                            imgsz=args.imgsz, roi=args.roi or None, camera=False,
+                            perfil=args.perfil, processo=args.processo or None)
+    servidor = ServidorRede(assistente, args.host, args.porta, max_lote=args.max_lote)
+    try:
+        asyncio.run(servidor.executar())
+    except KeyboardInterrupt:
+        print("\nEncerrando...")
+    finally:
+        assistente.detector.fechar()
+
+
+def _cliente(args):
+    from cache_audio import CacheAudio
+    from camera import GerenciadorCamera
+    from tts import FalaWorker
+
+    metricas.configurar(args)
+    fala = FalaWorker(cache=CacheAudio())
+    cap = GerenciadorCamera(args.camera, avisar=lambda texto: fala.falar(texto, URGENTE))
+    cap.abrir()
+    cliente = ClienteCamera(args.host, args.porta, cap=cap, fala=fala, nome=args.nome,
+                            latencia_alvo=args.latencia_alvo)
+    fala.falar("Cliente de camera ativado")
+    try:
+        asyncio.run(cliente.executar())
+    except KeyboardInterrupt:
+        print("\nEncerrando...")
+    finally:
+        cap.release()
+        fala.encerrar()
+
+
+if __name__ == "__main__":
+    from detector import adicionar_argumentos
+
+    parser = argparse.ArgumentParser(description="Assistente em rede: cliente de camera e servidor de inferencia")
+    modos = parser.add_subparsers(dest="modo", required=True)
+
+    servidor = modos.add_parser("servidor", help="roda o modelo e atende varios clientes")
+    servidor.add_argument("--host", default="0.0.0.0")
+    servidor.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    servidor.add_argument("--perfil", default="offline",
+                          help="nome em perfis/ ou caminho de um arquivo .toml/.yaml")
+    servidor.add_argument("--max-lote", type=int, default=4,
+                          help="maximo de frames (de clientes diferentes) por chamada ao modelo")
+    adicionar_argumentos(servidor)
+    metricas.adicionar_argumentos(servidor)
+    servidor.set_defaults(executar=_servidor)
+
+    cliente = modos.add_parser("cliente", help="envia a camera e fala os anuncios")
+    cliente.add_argument("host", help="endereco do servidor")
+    cliente.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    cliente.add_argument("--camera", type=int, default=0)
+    cliente.add_argument("--nome", default=None, help="nome do cliente nos logs do servidor")
+    cliente.add_argument("--latencia-alvo", type=float, default=0.3,
+                         help="ida e volta (s) acima da qual a qualidade do JPEG cai")
+    metricas.adicionar_argumentos(cliente)
+    cliente.set_defaults(executar=_cliente)
+
+    args = parser.parse_args()
+    args.executar(args)
@@ -2,39 +2,20 @@
 Reinicia e testa câmera
 """
 import cv2
-import time
 
-def reiniciar_camera():
+from camera import GerenciadorCamera
+
+def reiniciar_camera(fonte=0):
     print("Reiniciando camera...")
     
-    # Liberar todos os recursos
-    for i in range(5):
-        try:
-            cap = cv2.VideoCapture(i)
-            cap.release()
-        except:
-            pass
-    
     cv2.destroyAllWindows()
-    time.sleep(2)
-    
-    print("Testando camera com DirectShow...")
-    
-    # Tentar com DirectShow (melhor para Windows)
-    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
     
-    if not cap.isOpened():
-        print("Tentando sem DirectShow...")
-        cap = cv2.VideoCapture(0)
+    # Mesmo gerenciador dos assistentes: backends em ordem (DSHOW, V4L2, padrão),
+    # MJPEG 640x480 a 30 fps e reconexão automática se a câmera cair
+    cap = GerenciadorCamera(fonte)
     
-    if not cap.isOpened():
-        print("ERRO: Camera nao disponivel")
-        return
-    
-    # Configurar camera
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    cap.set(cv2.CAP_PROP_FPS, 30)
+    if not cap.abrir():
+        print("ERRO: Camera nao disponivel (continua tentando; ESC para sair)")
     
     print("Camera iniciada! Pressione ESC para sair")
     
@@ -42,13 +23,21 @@ def reiniciar_camera():
         ret, frame = cap.read()
         
         if not ret:
-            print("Erro ao capturar frame")
-            break
+            if cap.encerrada:
+                print("Erro ao capturar frame")
+                break
+            # Reconectando: mantém a janela respondendo
+            if cv2.waitKey(100) & 0xFF == 27:
+                break
+            continue
         
         # Adicionar texto na imagem
         cv2.putText(frame, "CAMERA FUNCIONANDO", (10, 30), 
                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
         
+        cv2.putText(frame, f"{cap.backend} - reconexoes: {cap.reconexoes}", (10, 60), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+        
         cv2.putText(frame, "Pressione ESC para sair", (10, 450), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
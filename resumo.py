@@ -0,0 +1,122 @@
+"""
+Resumo da cena: agrupa detecções por classe e zona, ordena por risco e evita repetir o que já foi dito
+"""
+import numpy as np
+
+from pos_processamento import DISTANCIAS, POSICOES, FRENTE, PROXIMO
+from tts import URGENTE, prioridade_distancia
+
+# Peso de risco por classe COCO (1.0 para as demais)
+RISCO = {
+    'car': 3.0,
+    'bus': 3.0,
+    'truck': 3.0,
+    'motorcycle': 3.0,
+    'bicycle': 2.0,
+    'dog': 1.5,
+    'person': 1.0,
+}
+
+# Peso por faixa de distância: muito proximo, proximo, distante
+PESO_DISTANCIA = np.array([3.0, 2.0, 1.0], np.float32)
+# O caminho à frente pesa mais que as laterais
+PESO_FRENTE = 1.5
+
+
+class ResumidorCena:
+    """Uma frase curta com os grupos mais perigosos da cena
+
+    Cada detecção recebe risco = peso da classe × proximidade (faixa de
+    distância, com peso extra à frente) × aproximação (1 + `ttc_referencia` /
+    tempo até o contato). Detecções da mesma classe na mesma zona viram um
+    grupo ("tres pessoas proximas a frente", texto pronto da TabelaFrases);
+    os `max_grupos` de maior risco entram na frase. Um grupo dito há menos de
+    `memoria` segundos só volta se cresceu, chegou mais perto ou está se
+    aproximando.
+    """
+
+    def __init__(self, frases, max_grupos=3, memoria=8.0, risco=None, ttc_referencia=2.0,
+                 distancia_max=2):
+        self.frases = frases
+        self.max_grupos = max_grupos
+        self.memoria = memoria
+        self.ttc_referencia = ttc_referencia
+        self.distancia_max = distancia_max
+
+        names = frases.names
+        tabela = {**RISCO, **(risco or {})}
+        total = max(names) + 1
+        self.risco = np.array([tabela.get(names.get(i), 1.0) for i in range(total)], np.float32)
+
+        # (classe, posição) -> (instante, quantidade, distância) do último anúncio
+        self.falados = {}
+
+    def pontuar(self, lote):
+        """(N,) risco de cada detecção"""
+        proximidade = PESO_DISTANCIA[lote.distancia]
+        proximidade = np.where(lote.posicao == FRENTE, proximidade * PESO_FRENTE, proximidade)
+        with np.errstate(divide='ignore'):
+            aproximacao = 1.0 + np.clip(self.ttc_referencia / lote.ttc, 0.0, 4.0)
+        return self.risco[lote.classe] * proximidade * aproximacao
+
+    def _repetido(self, chave, n, distancia, t):
+        anterior = self.falados.get(chave)
+        if anterior is None or t - anterior[0] > self.memoria:
+            return False
+        return n <= anterior[1] and distancia >= anterior[2]
+
+    def resumir(self, lote, t, forcar=(), mascara=None):
+        """(texto, prioridade) ou None se não há nada novo a dizer
+
+        `forcar` são índices do lote (ex.: eventos de aproximação) cujo grupo
+        entra mesmo que já tenha sido dito; `mascara` limita às linhas
+        visíveis no filtro temporal do rastreador.
+        """
+        alcance = lote.distancia <= self.distancia_max
+        dentro = np.flatnonzero(alcance if mascara is None else alcance & mascara)
+        if not len(dentro):
+            return None
+
+        risco = self.pontuar(lote)[dentro]
+        classe = lote.classe[dentro]
+        posicao = lote.posicao[dentro].astype(np.int64)
+        distancia = lote.distancia[dentro]
+
+        chaves, grupo = np.unique(classe.astype(np.int64) * len(POSICOES) + posicao,
+                                  return_inverse=True)
+        grupo = grupo.reshape(-1)
+        k = len(chaves)
+        quantidade = np.bincount(grupo, minlength=k)
+        pior = np.full(k, len(DISTANCIAS), np.int64)
+        np.minimum.at(pior, grupo, distancia)
+        maximo = np.zeros(k, np.float32)
+        np.maximum.at(maximo, grupo, risco)
+        forcados = np.zeros(k, bool)
+        forcados[grupo[np.isin(dentro, list(forcar))]] = True
+
+        # Grupos maiores pesam um pouco mais que o pior objeto isolado
+        pontuacao = maximo * (1.0 + 0.1 * (quantidade - 1))
+
+        partes = []
+        prioridade = None
+        for g in np.argsort(-pontuacao, kind='stable').tolist():
+            if len(partes) >= self.max_grupos:
+                break
+            c, p = divmod(int(chaves[g]), len(POSICOES))
+            n, d = int(quantidade[g]), int(pior[g])
+            if not forcados[g] and self._repetido((c, p), n, d, t):
+                continue
+
+            partes.append(self.frases.frase(c, d, p, n))
+            self.falados[(c, p)] = (t, n, d)
+
+            # Aproximação de algo próximo é urgente; o resto segue a distância
+            atual = URGENTE if forcados[g] and d <= PROXIMO else prioridade_distancia(d)
+            prioridade = atual if prioridade is None else min(prioridade, atual)
+
+        # Esquece o que já saiu da memória
+        self.falados = {chave: v for chave, v in self.falados.items() if t - v[0] <= self.memoria}
+
+        if not partes:
+            return None
+        return self.frases.juntar(partes), prioridade
@@ -0,0 +1,176 @@
+"""
+Servidor multi-câmera: um único modelo YOLO com inferência em lote para N câmeras
+"""
+import argparse
+import threading
+import time
+
+import metricas
+from assistente_offline import AssistenteOffline
+from camera import GerenciadorCamera
+from detector import adicionar_argumentos
+from metricas import METRICAS
+from motor import Anunciador
+from tts import URGENTE
+
+
+class CapturaCamera:
+    """Câmera do servidor: reconexão e frame mais recente ficam com o GerenciadorCamera"""
+
+    def __init__(self, nome, fonte, aviso_novo_frame, avisar=None):
+        self.nome = nome
+        self.cap = GerenciadorCamera(fonte, nome=nome, aviso_frame=aviso_novo_frame,
+                                     avisar=avisar)
+
+    @property
+    def ativa(self):
+        # Câmera reconectando continua no rodízio; só sai quando encerra
+        return not self.cap.encerrada
+
+    def abrir(self):
+        self.cap.abrir()
+        return self.ativa
+
+    def pegar(self):
+        """Frame novo ou None, sem esperar"""
+        ret, frame = self.cap.read(timeout=0)
+        return frame if ret else None
+
+    def fechar(self):
+        self.cap.release()
+
+
+class ServidorMultiCamera:
+    """Agrupa os frames mais recentes das câmeras em uma única chamada ao modelo"""
+
+    def __init__(self, fontes, max_lote=4, espera_max=0.02, assistente=None):
+        self.max_lote = max_lote
+        self.espera_max = espera_max
+
+        # Uma única instância de modelo e TTS para todas as câmeras
+        self.assistente = assistente or AssistenteOffline(camera=False)
+
+        self.novo_frame = threading.Event()
+        self.cameras = [CapturaCamera(str(i), fonte, self.novo_frame,
+                                      avisar=self._avisador(str(i)))
+                        for i, fonte in enumerate(fontes)]
+        # Rastreador, filtro temporal e intervalo de anúncio independentes por câmera
+        self.anunciadores = {c.nome: Anunciador(self.assistente.perfil, self.assistente.frases,
+                                                self._falante(c.nome))
+                             for c in self.cameras}
+
+        self._inicio_rodizio = 0
+        self.lotes = 0
+        self.frames = 0
+
+    def _falante(self, nome):
+        return lambda texto, prioridade: self.assistente.speak(f"camera {nome}, {texto}", prioridade)
+
+    def _avisador(self, nome):
+        return lambda texto: self.assistente.speak(f"camera {nome}, {texto}", URGENTE)
+
+    def _coletar_lote(self):
+        """Junta até max_lote frames esperando no máximo espera_max pelos demais"""
+        if not self.novo_frame.wait(timeout=0.5):
+            return []
+        self.novo_frame.clear()
+
+        lote = []
+        pendentes = [c for c in self.cameras if c.ativa]
+
+        # Rodízio para que câmeras além do max_lote não fiquem sempre de fora
+        n = len(pendentes)
+        if n:
+            k = self._inicio_rodizio % n
+            pendentes = pendentes[k:] + pendentes[:k]
+            self._inicio_rodizio += 1
+
+        limite = time.perf_counter() + self.espera_max
+        while pendentes and len(lote) < self.max_lote:
+            restantes = []
+            for camera in pendentes:
+                frame = camera.pegar()
+                if frame is None:
+                    restantes.append(camera)
+                    continue
+                lote.append((camera, frame))
+                if len(lote) >= self.max_lote:
+                    break
+            pendentes = restantes
+
+            espera = limite - time.perf_counter()
+            if not pendentes or espera <= 0:
+                break
+            self.novo_frame.wait(timeout=espera)
+            self.novo_frame.clear()
+
+        return lote
+
+    def executar(self):
+        abertas = [c for c in self.cameras if c.abrir()]
+        if not abertas:
+            print("ERRO: Nenhuma camera disponivel")
+            return
+
+        print(f"Servidor multi-camera iniciado com {len(abertas)} camera(s)")
+        self.assistente.speak("Servidor de cameras ativado")
+
+        try:
+            while any(c.ativa for c in self.cameras):
+                lote = self._coletar_lote()
+                if not lote:
+                    continue
+
+                frames = [frame for _, frame in lote]
+                try:
+                    deteccoes = self.assistente.detect_batch(frames)
+                except Exception as e:
+                    # Ex.: worker de inferência reiniciando (--processo); segue no próximo lote
+                    print(f"Erro na inferência: {e}")
+                    METRICAS.incrementar("erros_inferencia")
+                    continue
+
+                # Distribuir resultados para o anunciador de cada câmera
+                agora = time.time()
+                for (camera, _), detections in zip(lote, deteccoes):
+                    self.anunciadores[camera.nome].anunciar(detections, agora)
+
+                self.lotes += 1
+                self.frames += len(lote)
+                METRICAS.definir("tamanho_lote", len(lote))
+
+        except KeyboardInterrupt:
+            print("\nEncerrando...")
+        finally:
+            for camera in self.cameras:
+                camera.fechar()
+            self.assistente.detector.fechar()
+            self.assistente.fala.encerrar()
+            if self.lotes:
+                print(f"Lotes: {self.lotes}, media {self.frames / self.lotes:.1f} frames por lote")
+
+
+def _fonte(valor):
+    """Índice numérico de câmera ou caminho/URL de vídeo"""
+    return int(valor) if valor.isdigit() else valor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor multi-camera com inferencia em lote")
+    parser.add_argument("fontes", nargs="+", type=_fonte,
+                        help="indices de camera ou URLs/arquivos de video")
+    parser.add_argument("--max-lote", type=int, default=4,
+                        help="maximo de frames por chamada ao modelo")
+    parser.add_argument("--espera-max", type=float, default=0.02,
+                        help="tempo maximo (s) aguardando para completar o lote")
+    adicionar_argumentos(parser)
+    metricas.adicionar_argumentos(parser)
+    args = parser.parse_args()
+    metricas.configurar(args)
+
+    assistente = AssistenteOffline(args.backend, args.modelo, args.threads,
+                                   imgsz=args.imgsz, roi=args.roi or None, camera=False,
+                                   processo=args.processo or None)
+    servidor = ServidorMultiCamera(args.fontes, max_lote=args.max_lote,
+                                   espera_max=args.espera_max, assistente=assistente)
+    servidor.executar()
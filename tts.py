@@ -0,0 +1,316 @@
+"""
+Worker de voz persistente com fila de prioridade
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from cache_audio import ReprodutorAudio
+from metricas import METRICAS
+from pos_processamento import MUITO_PROXIMO, PROXIMO
+
+# Prioridades (menor valor fala primeiro)
+URGENTE, NORMAL, BAIXA = 0, 1, 2
+
+# Tempo máximo (s) que uma fala pode esperar na fila antes de ficar obsoleta
+VALIDADE = {URGENTE: 2.0, NORMAL: 4.0, BAIXA: 6.0}
+
+# Flags do SAPI
+SVSF_ASYNC = 1
+SVSF_PURGE = 2
+SSFM_CREATE_FOR_WRITE = 3
+
+# Retorno de _proxima quando o worker deve terminar
+_FIM = object()
+
+
+def prioridade_distancia(distancia):
+    """Prioridade de fala a partir do código de distância"""
+    if distancia == MUITO_PROXIMO:
+        return URGENTE
+    if distancia == PROXIMO:
+        return NORMAL
+    return BAIXA
+
+
+class FalaWorker:
+    """Thread única dona do motor de TTS
+
+    Falas urgentes descartam as pendentes de menor prioridade e interrompem a
+    fala em andamento; textos repetidos na fila são agrupados e falas que
+    esperaram mais que a validade são descartadas.
+
+    Com um CacheAudio, frases já sintetizadas tocam direto do buffer (um
+    resumo, parte por parte) e o tempo ocioso é usado para sintetizar as
+    frases pendentes do cache; uma fala nova interrompe essa síntese.
+    """
+
+    def __init__(self, backends=("windows", "pyttsx3"), rate_windows=1, rate_pyttsx3=150,
+                 cache=None):
+        self.backends = backends
+        self.rate_windows = rate_windows
+        self.rate_pyttsx3 = rate_pyttsx3
+
+        self.reprodutor = ReprodutorAudio() if cache is not None else None
+        if self.reprodutor is not None and not self.reprodutor.disponivel:
+            # Sem simpleaudio/winsound o áudio em cache nunca tocaria: nem sintetiza
+            print("AVISO: cache de voz desativado (instale simpleaudio)")
+            self.reprodutor = None
+            cache = None
+        self.cache = cache
+        self._voz_arquivo = None
+
+        self.tts = None
+        self.tts_type = "none"
+
+        self._fila = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._atual = None
+        self._interromper = False
+        self._sintetizando = False
+        self._encerrado = False
+
+        self.faladas = 0
+        self.descartadas = 0
+
+        self._pronto = threading.Event()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+        self._pronto.wait(timeout=10)
+
+    @property
+    def speaking(self):
+        return self._atual is not None
+
+    def _iniciar_motor(self):
+        """Inicializa o TTS dentro da thread que vai usá-lo"""
+        for backend in self.backends:
+            try:
+                if backend == "windows":
+                    import pythoncom
+                    import win32com.client
+
+                    pythoncom.CoInitialize()
+                    self.tts = win32com.client.Dispatch("SAPI.SpVoice")
+                    self.tts.Rate = self.rate_windows
+                    self.tts_type = "windows"
+                    print("TTS Windows ativado")
+                    return
+                if backend == "pyttsx3":
+                    import pyttsx3
+
+                    self.tts = pyttsx3.init()
+                    self.tts.setProperty('rate', self.rate_pyttsx3)
+                    self.tts.connect('started-word', self._palavra_pyttsx3)
+                    self.tts_type = "pyttsx3"
+                    print("TTS pyttsx3 ativado")
+                    return
+            except Exception:
+                continue
+
+        self.tts = None
+        self.tts_type = "none"
+        print("AVISO: TTS não disponível")
+
+    def falar(self, texto, prioridade=NORMAL):
+        """Enfileira uma fala; nunca bloqueia quem chama"""
+        agora = time.time()
+        with self._cond:
+            if self._encerrado:
+                return
+
+            # Qualquer fala vale mais que aquecer o cache: a síntese em andamento para
+            if self._sintetizando:
+                self._interromper = True
+
+            # Texto repetido: mantém um só, com a maior prioridade
+            fala = (prioridade, next(self._seq), texto, agora)
+            for i, (p, seq, t, criado) in enumerate(self._fila):
+                if t == texto:
+                    prioridade = min(p, prioridade)
+                    fala = (prioridade, seq, t, agora)
+                    del self._fila[i]
+                    heapq.heapify(self._fila)
+                    break
+
+            # Urgente (nova ou promovida) descarta as menores e interrompe a atual
+            if prioridade == URGENTE:
+                antes = len(self._fila)
+                self._fila = [f for f in self._fila if f[0] <= prioridade]
+                heapq.heapify(self._fila)
+                self.descartadas += antes - len(self._fila)
+                METRICAS.incrementar("falas_descartadas", antes - len(self._fila))
+
+                if self._atual is not None and self._atual[0] > prioridade:
+                    self._interromper = True
+
+            heapq.heappush(self._fila, fala)
+            METRICAS.definir("fila_fala", len(self._fila))
+            self._cond.notify()
+
+    def aquecer(self, textos, separador=None):
+        """Agenda textos no cache de voz e acorda o worker para sintetizá-los"""
+        if self.cache is None:
+            return
+        self.cache.aquecer(textos, separador)
+        with self._cond:
+            self._cond.notify()
+
+    def _proxima(self):
+        """Retira a próxima fala válida; None se há tempo ocioso, _FIM ao encerrar"""
+        with self._cond:
+            while True:
+                while not self._fila and not self._encerrado:
+                    if self.cache is not None and self.cache.tem_pendentes():
+                        return None
+                    self._cond.wait()
+                if not self._fila:
+                    return _FIM
+
+                fala = heapq.heappop(self._fila)
+                prioridade, _, _, criado = fala
+                espera = time.time() - criado
+                if espera > VALIDADE[prioridade]:
+                    self.descartadas += 1
+                    METRICAS.incrementar("falas_descartadas")
+                    continue
+
+                METRICAS.observar("fala_espera", espera)
+                METRICAS.definir("fila_fala", len(self._fila))
+
+                self._atual = fala
+                self._interromper = False
+                return fala
+
+    def _executar(self):
+        self._iniciar_motor()
+        if self.cache is not None:
+            rate = self.rate_windows if self.tts_type == "windows" else self.rate_pyttsx3
+            self.cache.configurar_voz(f"{self.tts_type}:{rate}")
+        self._pronto.set()
+
+        while True:
+            fala = self._proxima()
+            if fala is _FIM:
+                break
+            if fala is None:
+                self._sintetizar_pendente()
+                continue
+
+            texto = fala[2]
+            try:
+                print(f"VOZ: {texto}")
+                with METRICAS.cronometrar("fala"):
+                    self._reproduzir(texto)
+                self.faladas += 1
+                METRICAS.incrementar("falas")
+            except Exception as e:
+                print(f"Erro TTS: {e}")
+            finally:
+                with self._cond:
+                    self._atual = None
+
+    def _reproduzir(self, texto):
+        # Áudio em cache: toca o buffer sem passar pela síntese
+        if self.cache is not None and self.tts_type != "none" and self.reprodutor.disponivel:
+            # Resumo: toca as partes do vocabulário em sequência, sem cachear a junção
+            partes = self.cache.obter_partes(texto)
+            if partes is not None and None not in partes:
+                for audio in partes:
+                    if self._interromper:
+                        break
+                    self.reprodutor.tocar(audio, lambda: self._interromper)
+                return
+            audio = self.cache.obter(texto) if partes is None else None
+            if audio is not None:
+                self.reprodutor.tocar(audio, lambda: self._interromper)
+                return
+
+        if self.tts_type == "windows":
+            # Fala assíncrona para poder interromper no meio
+            self.tts.Speak(texto, SVSF_ASYNC)
+            while not self.tts.WaitUntilDone(50):
+                if self._interromper:
+                    self.tts.Speak("", SVSF_ASYNC | SVSF_PURGE)
+                    break
+        elif self.tts_type == "pyttsx3":
+            self.tts.say(texto)
+            self.tts.runAndWait()
+        else:
+            # Fallback: apenas print
+            print(f"[AUDIO INDISPONIVEL] {texto}")
+
+    def _sintetizar_pendente(self):
+        """Sintetiza uma frase pendente do cache para um arquivo WAV
+
+        Roda na thread do motor, mas para assim que uma fala entra na fila: a
+        frase interrompida volta para o início dos pendentes.
+        """
+        texto = self.cache.proximo_pendente()
+        if texto is None or self.tts_type == "none":
+            return
+
+        caminho = self.cache.caminho(texto)
+        temporario = caminho + ".tmp.wav"
+        with self._cond:
+            if self._fila:
+                self.cache.adiar(texto)
+                return
+            self._interromper = False
+            self._sintetizando = True
+        try:
+            if self.tts_type == "windows":
+                import win32com.client
+
+                # Voz separada para não desviar a saída de áudio da principal
+                if self._voz_arquivo is None:
+                    self._voz_arquivo = win32com.client.Dispatch("SAPI.SpVoice")
+                    self._voz_arquivo.Rate = self.rate_windows
+                stream = win32com.client.Dispatch("SAPI.SpFileStream")
+                stream.Open(temporario, SSFM_CREATE_FOR_WRITE)
+                try:
+                    self._voz_arquivo.AudioOutputStream = stream
+                    # Assíncrona para a fila não esperar a frase inteira
+                    self._voz_arquivo.Speak(texto, SVSF_ASYNC)
+                    while not self._voz_arquivo.WaitUntilDone(50):
+                        if self._interromper:
+                            self._voz_arquivo.Speak("", SVSF_ASYNC | SVSF_PURGE)
+                            break
+                finally:
+                    stream.Close()
+            else:
+                # Interrompida pelo callback 'started-word'
+                self.tts.save_to_file(texto, temporario)
+                self.tts.runAndWait()
+
+            with self._cond:
+                self._sintetizando = False
+                interrompida = self._interromper
+            if interrompida:
+                self.cache.adiar(texto)
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+                return
+            os.replace(temporario, caminho)
+            self.cache.registrar(texto)
+        except Exception as e:
+            print(f"Erro ao gerar audio em cache: {e}")
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        finally:
+            with self._cond:
+                self._sintetizando = False
+
+    def _palavra_pyttsx3(self, name, location, length):
+        if self._interromper:
+            self.tts.stop()
+
+    def encerrar(self, timeout=5):
+        """Fala o que já está na fila e finaliza a thread"""
+        with self._cond:
+            self._encerrado = True
+            self._cond.notify_all()
+        self._thread.join(timeout)